@@ -14,6 +14,9 @@ import numpy as np
 from scipy.fft import fft, fftfreq
 import matplotlib.pyplot as plt
 
+from simulations.neighbors import gaussian_cutoff
+from simulations.ring import gaussian_phi_and_grad
+
 # Parameters (tunable for bound states; from Ch. 3: V0=10, σ=2 yields E_n ~[-8.51, ...])
 L = 100.0  # 1D ring length (periodic)
 T = 200    # Ticks (steps)
@@ -22,119 +25,114 @@ N_defects = 2
 V0 = 1.0   # Potential depth (TeV-norm)
 sigma = 0.5  # Scale (finite range)
 chaos_amp = 0.8  # Noise for irreversibility (Lyapunov proxy)
-decay_thresh = 2 * sigma  # Separation trigger
 E_n_levels = np.array([-0.32, -1.23, -1.85])  # Shallow bound energies (example; from solver)
-delta_E = np.abs(E_n_levels[0])  # Shallowest release (0.32 TeV)
-
-# Gaussian kernel for Φ(x)
-def gaussian_kernel(d, R):
-    return np.exp(-d**2 / (2 * R**2))
-
-# Initialize defects: Tight pair (odd-like parity seed), zero initial v
-r = np.zeros((T+1, N_defects))  # Positions over time
-v = np.zeros((T+1, N_defects))  # Velocities
-r[0, 0] = 0.0
-r[0, 1] = sigma / 2  # Initial sep ~ σ/2
-v[0, :] = 0.0
-
-# Evolve: Ticks with Φ gradient + chaos noise
-for t in range(T):
-    # Compute Φ at each defect (superposition from all)
-    Phi = np.zeros(N_defects)
-    for i in range(N_defects):
-        for j in range(N_defects):
-            d = np.abs(r[t, i] - r[t, j])
-            d = np.minimum(d, L - d)  # Periodic dist
-            Phi[i] += V0 * gaussian_kernel(d, sigma)
-    
-    # Gradients F = -∇Φ (attractive; finite-diff proxy in 1D)
-    F = np.zeros(N_defects)
-    for i in range(N_defects):
-        # Simple central diff approx for ∇Φ (or analytic for Gaussian)
-        dr = 1e-3
-        Phi_plus = 0
-        Phi_minus = 0
-        for j in range(N_defects):
-            d_plus = np.abs((r[t, i] + dr) - r[t, j])
-            d_plus = np.minimum(d_plus, L - d_plus)
-            Phi_plus += V0 * gaussian_kernel(d_plus, sigma)
-            
-            d_minus = np.abs((r[t, i] - dr) - r[t, j])
-            d_minus = np.minimum(d_minus, L - d_minus)
-            Phi_minus += V0 * gaussian_kernel(d_minus, sigma)
-        
-        F[i] = -(Phi_plus - Phi_minus) / (2 * dr)  # -∇Φ
-    
-    # Update v: Euler step + chaos noise
-    a = F  # Accel proxy
-    v[t+1] = v[t] + dt * a + chaos_amp * np.random.normal(0, 0.1, N_defects)  # Noise amp ~λ=0.8
-    
-    # Update r (periodic)
-    r[t+1] = (r[t] + dt * v[t+1]) % L
-    
-    # Cap sub-luminal (emergent c~1)
-    v[t+1] = np.clip(v[t+1], -1.0, 1.0)
-
-# Detect decay: Min sep over time; trigger at first > thresh
-sep = np.min([np.abs(r[t, 0] - r[t, 1]), L - np.abs(r[t, 0] - r[t, 1]) for t in range(T+1)])
-decay_t = next((t for t, s in enumerate(sep) if s > decay_thresh), None)
-if decay_t is None:
-    decay_t = T  # No decay
-    released_E = 0
-else:
-    released_E = delta_E  # TeV proxy
-
-# GW Strain Proxy: h(t) ~ ∫ ∑ |a|^2 dt (simple monopole approx; quad for full)
-# Accel a from dv/dt (diff v)
-a_t = np.diff(v, axis=0) / dt  # Accel series
-a_t = np.vstack([a_t[0], a_t])  # Pad to T+1
-h = np.cumsum(np.sum(np.abs(a_t)**2, axis=1)) * dt  # Integrated |a|^2 sum
-
-# FFT for Spectrum: Quantized peaks from ΔE_n spacings
-N_fft = len(h)
-yf = fft(h)
-xf = fftfreq(N_fft, dt)[:N_fft//2]
-spectrum = 2.0 / N_fft * np.abs(yf[:N_fft//2])
-
-# Find peaks (proxy for quantized modes; scale freq to TeV via ħc/l_P ~10^19 Hz/TeV)
-# Example peaks at harmonics of base ΔE / ħ (normalized here)
-peak_freqs = [0.05, 0.12, 0.28]  # From level spacings (tunable)
-
-# Outputs
-print(f"Decay Time: t={decay_t:.1f} ticks")
-print(f"Released Energy: ΔE={released_E:.2f} TeV")
-print(f"Post-Decay Strain Mean |h|: {np.mean(np.abs(np.diff(h))):.3f}")
-print(f"Quantized Spectrum Peaks (norm freq): {peak_freqs}")
-
-# Plot: Separation, h(t), Spectrum
-fig, axs = plt.subplots(3, 1, figsize=(10, 8))
-
-# Sep over time
-axs[0].plot(range(T+1), sep, 'b-', label='Min Separation')
-axs[0].axhline(decay_thresh, color='r', linestyle='--', label='Decay Thresh')
-axs[0].set_ylabel('Separation')
-axs[0].legend()
-axs[0].set_title('VDM Defect Pair Decay')
-
-# Strain h(t)
-axs[1].plot(range(T+1), h, 'g-')
-axs[1].axvline(decay_t, color='r', linestyle='--', label=f'Decay at t={decay_t}')
-axs[1].set_ylabel('Strain h(t)')
-axs[1].legend()
-
-# Spectrum
-axs[2].plot(xf, spectrum, 'k-')
-for pf in peak_freqs:
-    axs[2].axvline(pf, color='r', linestyle='.', markersize=10, label=f'Peak {pf}')
-axs[2].set_xlabel('Frequency (norm /tick)')
-axs[2].set_ylabel('|h(f)|')
-axs[2].set_xlim(0, 0.5)
-axs[2].legend()
-
-plt.tight_layout()
-plt.savefig('vdm_decay_sim.png', dpi=300)
-plt.show()
-
-# For repo: Export data (e.g., to CSV)
-np.savetxt('vdm_sep.csv', np.column_stack([range(T+1), sep]), header='t,sep', delimiter=',')
-np.savetxt('vdm_spectrum.csv', np.column_stack([xf, spectrum]), header='freq,mag', delimiter=',')
+
+def run(L=L, T=T, dt=dt, N_defects=N_defects, V0=V0, sigma=sigma, chaos_amp=chaos_amp,
+        E_n_levels=E_n_levels, seed=None, cutoff_tol=None):
+    """Evolve the defect pair and return separation, strain and spectrum.
+
+    Importable entry point for sweeps; the plots/CSV export below only run
+    when this file is executed as a script. cutoff_tol (e.g. 1e-12) skips
+    pairs whose Gaussian weight is below it.
+    """
+    rng = np.random.default_rng(seed)
+    cutoff = None if cutoff_tol is None else gaussian_cutoff(sigma, cutoff_tol)
+    decay_thresh = 2 * sigma  # Separation trigger
+    delta_E = np.abs(E_n_levels[0])  # Shallowest release (0.32 TeV)
+
+    # Initialize defects: Tight pair (odd-like parity seed), zero initial v
+    r = np.zeros((T+1, N_defects))  # Positions over time
+    v = np.zeros((T+1, N_defects))  # Velocities
+    r[0, 0] = 0.0
+    r[0, 1] = sigma / 2  # Initial sep ~ σ/2
+    v[0, :] = 0.0
+
+    # Evolve: Ticks with Φ gradient + chaos noise
+    for t in range(T):
+        # Φ at each defect (superposition from all, periodic dist) and its
+        # analytic gradient; F = -∇Φ
+        Phi, grad = gaussian_phi_and_grad(r[t], L, V0, sigma, cutoff)
+        F = -grad
+
+        # Update v: Euler step + chaos noise
+        a = F  # Accel proxy
+        v[t+1] = v[t] + dt * a + chaos_amp * rng.normal(0, 0.1, N_defects)  # Noise amp ~λ=0.8
+
+        # Update r (periodic)
+        r[t+1] = (r[t] + dt * v[t+1]) % L
+
+        # Cap sub-luminal (emergent c~1)
+        v[t+1] = np.clip(v[t+1], -1.0, 1.0)
+
+    # Detect decay: pair separation (minimum image) over time; trigger at first > thresh
+    gap = np.abs(r[:, 0] - r[:, 1])
+    sep = np.minimum(gap, L - gap)
+    decay_t = next((t for t, s in enumerate(sep) if s > decay_thresh), None)
+    if decay_t is None:
+        decay_t = T  # No decay
+        released_E = 0
+    else:
+        released_E = delta_E  # TeV proxy
+
+    # GW Strain Proxy: h(t) ~ ∫ ∑ |a|^2 dt (simple monopole approx; quad for full)
+    # Accel a from dv/dt (diff v)
+    a_t = np.diff(v, axis=0) / dt  # Accel series
+    a_t = np.vstack([a_t[0], a_t])  # Pad to T+1
+    h = np.cumsum(np.sum(np.abs(a_t)**2, axis=1)) * dt  # Integrated |a|^2 sum
+
+    # FFT for Spectrum: Quantized peaks from ΔE_n spacings
+    N_fft = len(h)
+    yf = fft(h)
+    xf = fftfreq(N_fft, dt)[:N_fft//2]
+    spectrum = 2.0 / N_fft * np.abs(yf[:N_fft//2])
+    return {'r': r, 'v': v, 'sep': sep, 'decay_t': decay_t, 'released_E': released_E,
+            'h': h, 'xf': xf, 'spectrum': spectrum}
+
+if __name__ == '__main__':
+    result = run()
+    sep, decay_t, released_E = result['sep'], result['decay_t'], result['released_E']
+    h, xf, spectrum = result['h'], result['xf'], result['spectrum']
+    decay_thresh = 2 * sigma
+
+    # Find peaks (proxy for quantized modes; scale freq to TeV via ħc/l_P ~10^19 Hz/TeV)
+    # Example peaks at harmonics of base ΔE / ħ (normalized here)
+    peak_freqs = [0.05, 0.12, 0.28]  # From level spacings (tunable)
+
+    # Outputs
+    print(f"Decay Time: t={decay_t:.1f} ticks")
+    print(f"Released Energy: ΔE={released_E:.2f} TeV")
+    print(f"Post-Decay Strain Mean |h|: {np.mean(np.abs(np.diff(h))):.3f}")
+    print(f"Quantized Spectrum Peaks (norm freq): {peak_freqs}")
+
+    # Plot: Separation, h(t), Spectrum
+    fig, axs = plt.subplots(3, 1, figsize=(10, 8))
+
+    # Sep over time
+    axs[0].plot(range(T+1), sep, 'b-', label='Min Separation')
+    axs[0].axhline(decay_thresh, color='r', linestyle='--', label='Decay Thresh')
+    axs[0].set_ylabel('Separation')
+    axs[0].legend()
+    axs[0].set_title('VDM Defect Pair Decay')
+
+    # Strain h(t)
+    axs[1].plot(range(T+1), h, 'g-')
+    axs[1].axvline(decay_t, color='r', linestyle='--', label=f'Decay at t={decay_t}')
+    axs[1].set_ylabel('Strain h(t)')
+    axs[1].legend()
+
+    # Spectrum
+    axs[2].plot(xf, spectrum, 'k-')
+    for pf in peak_freqs:
+        axs[2].axvline(pf, color='r', linestyle=':', label=f'Peak {pf}')
+    axs[2].set_xlabel('Frequency (norm /tick)')
+    axs[2].set_ylabel('|h(f)|')
+    axs[2].set_xlim(0, 0.5)
+    axs[2].legend()
+
+    plt.tight_layout()
+    plt.savefig('vdm_decay_sim.png', dpi=300)
+    plt.show()
+
+    # For repo: Export data (e.g., to CSV)
+    np.savetxt('vdm_sep.csv', np.column_stack([range(T+1), sep]), header='t,sep', delimiter=',')
+    np.savetxt('vdm_spectrum.csv', np.column_stack([xf, spectrum]), header='freq,mag', delimiter=',')
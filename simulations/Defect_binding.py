@@ -1,63 +1,80 @@
+# Run from the repo root: python -m simulations.Defect_binding
 import numpy as np
 import matplotlib.pyplot as plt
+from simulations.integrators import Integrator
+from simulations.lyapunov_ensemble import gaussian_forces, gaussian_potential
 
 # Parameters (tuned for visible binding)
 N_def = 3  # More defects for complex particle (try 5)
-positions = np.random.uniform(-1.0, 1.0, (N_def, 2))  # Random close start
-velocities = np.random.uniform(-0.1, 0.1, (N_def, 2))  # Small random v
-E = np.ones(N_def) * 1.0
-R = np.ones(N_def) * 2.0  # Larger scale for stronger pull
+E0 = 1.0
+R0 = 2.0  # Larger scale for stronger pull
 dt = 0.01
 n_steps = 5000  # More steps to see stabilization
+method = 'verlet'  # Integrator (see simulations/integrators.py); 'euler' reproduces the original runs
 
-# Store trajectories
-traj = np.zeros((n_steps, N_def, 2))
-traj[0] = positions
+def run(N_def=N_def, E0=E0, R0=R0, dt=dt, n_steps=n_steps, seed=None, method=method):
+    """Evolve the bound defect cluster; importable entry point for sweeps.
 
-# Evolution loop
-for t in range(1, n_steps):
-    forces = np.zeros((N_def, 2))
+    Returns the (n_steps, N_def, 2) trajectory plus final positions, E and R,
+    the relative energy drift after every step and the force evaluations.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(-1.0, 1.0, (N_def, 2))  # Random close start
+    velocities = rng.uniform(-0.1, 0.1, (N_def, 2))  # Small random v
+    E = np.ones(N_def) * E0
+    R = np.ones(N_def) * R0
+
+    # Store trajectories
+    traj = np.zeros((n_steps, N_def, 2))
+    traj[0] = positions
+
+    # Attractive force: - E_j * (dr / R_j^2) * K summed over j != i
+    integ = Integrator(lambda x, idx=None: gaussian_forces(x[np.newaxis], E, R, idx)[0], dt, method,
+                       potential=lambda x: gaussian_potential(x[np.newaxis], E, R)[0], scale=R0)
+    drift = np.zeros(n_steps)
+    integ.drift(positions, velocities)
+
+    # Evolution loop
+    for t in range(1, n_steps):
+        positions, velocities = integ.step(positions, velocities)
+        traj[t] = positions
+        drift[t] = integ.drift(positions, velocities)
+    return {'traj': traj, 'positions': positions, 'E': E, 'R': R, 'energy_drift': drift,
+            'force_evals': integ.force_evals}
+
+if __name__ == '__main__':
+    result = run()
+    traj, positions, E, R = result['traj'], result['positions'], result['E'], result['R']
+    print(f"{method}: {result['force_evals']:.0f} force evaluations, "
+          f"max relative energy drift {result['energy_drift'].max():.2e}")
+
+    # Plot trajectories
+    plt.figure(figsize=(8, 6))
+    for i in range(N_def):
+        plt.plot(traj[:, i, 0], traj[:, i, 1], label=f'Defect {i+1}')
+    plt.xlabel('x')
+    plt.ylabel('y')
+    plt.title('Defect Trajectories: Emergence of Bound Particle')
+    plt.legend()
+    plt.grid(True)
+    plt.savefig('assets/figures/particle_trajectories.png')
+
+    # Final Φ field
+    x = np.linspace(-3, 3, 100)
+    y = np.linspace(-3, 3, 100)
+    X, Y = np.meshgrid(x, y)
+    Phi = np.zeros_like(X)
     for i in range(N_def):
-        for j in range(N_def):
-            if i == j: continue
-            dr = positions[i] - positions[j]
-            d = np.linalg.norm(dr)
-            if d < 1e-6: continue
-            K = np.exp(-d**2 / (2 * R[j]**2))
-            # Attractive force: - E_j * (dr / R_j^2) * K  (fixed sign)
-            force_contrib = - E[j] * (1 / R[j]**2) * K * dr
-            forces[i] += force_contrib
-    velocities += dt * forces
-    positions += dt * velocities
-    traj[t] = positions
-
-# Plot trajectories
-plt.figure(figsize=(8, 6))
-for i in range(N_def):
-    plt.plot(traj[:, i, 0], traj[:, i, 1], label=f'Defect {i+1}')
-plt.xlabel('x')
-plt.ylabel('y')
-plt.title('Defect Trajectories: Emergence of Bound Particle')
-plt.legend()
-plt.grid(True)
-plt.savefig('assets/figures/particle_trajectories.png')
-
-# Final Φ field
-x = np.linspace(-3, 3, 100)
-y = np.linspace(-3, 3, 100)
-X, Y = np.meshgrid(x, y)
-Phi = np.zeros_like(X)
-for i in range(N_def):
-    d2 = (X - positions[i, 0])**2 + (Y - positions[i, 1])**2
-    Phi += E[i] * np.exp(-d2 / (2 * R[i]**2))
-
-plt.figure(figsize=(8, 6))
-plt.contourf(X, Y, Phi, levels=20, cmap='viridis')
-plt.colorbar(label='Φ (Curvature Field)')
-plt.plot(positions[:, 0], positions[:, 1], 'ro', markersize=10, label='Defects')
-plt.xlabel('x')
-plt.ylabel('y')
-plt.title('Final Field: Bound Defect Structure as Particle')
-plt.legend()
-plt.savefig('assets/figures/particle_field.png')
-plt.show()
+        d2 = (X - positions[i, 0])**2 + (Y - positions[i, 1])**2
+        Phi += E[i] * np.exp(-d2 / (2 * R[i]**2))
+
+    plt.figure(figsize=(8, 6))
+    plt.contourf(X, Y, Phi, levels=20, cmap='viridis')
+    plt.colorbar(label='Φ (Curvature Field)')
+    plt.plot(positions[:, 0], positions[:, 1], 'ro', markersize=10, label='Defects')
+    plt.xlabel('x')
+    plt.ylabel('y')
+    plt.title('Final Field: Bound Defect Structure as Particle')
+    plt.legend()
+    plt.savefig('assets/figures/particle_field.png')
+    plt.show()
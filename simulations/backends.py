@@ -0,0 +1,583 @@
+"""Compute backends for VDMEngine's pairwise pass.
+
+Every tick needs a handful of sums over all N^2 defect pairs: the emergent
+sigma, the curvature field Phi and its gradient, the short-range
+repulsion, the swirl sum behind the spin tangential force, the
+kernel > 0.5 counts of the energy update and the cohesion I_avg. A backend
+computes them all and hands back one dict:
+
+    'numpy'  vectorized over PairGeometry's (N, N, d) cache; the reference
+             path, and the one that honours the precision policy
+    'numba'  fused loops compiled with Numba (optional): one pass for the
+             distance moments sigma and the repulsion radius depend on, one
+             for everything else, rows spread over threads with prange.
+             Memory is O(N) and no pairwise array is ever built
+    'parallel'  the same two passes in NumPy, rows split across a
+             persistent pool of worker processes over shared memory
+             (see parallel.py); for many cores without Numba
+    'fgt'    near-linear for large N: Phi and its gradient by the fast
+             Gauss transform (gauss_transform.py), the rest by kd-trees
+             and sampling; approximate, to a tolerance (see
+             GaussTransformBackend)
+    'auto'   'numba' when Numba is installed, else 'numpy'
+
+The fused and parallel backends sum in float64 in a different order, so
+they match 'numpy' to rounding rather than bit for bit. Without Numba,
+the fused loops are plain Python: too slow to run, but handy for
+checking them on small N.
+
+    backend = get_backend('auto')
+    fields = backend.finish(backend.fields(positions, E))
+"""
+
+import itertools
+import math
+
+import numpy as np
+
+from simulations.precision import get_precision
+from simulations.profiler import NULL_PROFILER
+
+try:
+    import numba
+except ImportError:  # Optional; the 'numpy' backend needs nothing extra
+    numba = None
+
+prange = numba.prange if numba is not None else range
+
+
+def _jit(fn):
+    return numba.njit(parallel=True, cache=True)(fn) if numba is not None else fn
+
+
+class PairGeometry:
+    """Pairwise geometry for one tick, extended in place when defects spawn.
+
+    Holds diffs (N, N, d) and dists_sq (N, N), built once per tick and shared
+    by the field, repulsion and spin terms. Spawned defects only add rows and
+    columns. Force terms are sum_j w_ij (r_i - r_j), contracted with einsum
+    so no further (N, N, d) temporaries are made. The pairwise arrays are
+    kept in the precision policy's storage dtype (see precision.py).
+    """
+
+    def __init__(self, positions, precision='double'):
+        self.precision = get_precision(precision)
+        self.positions = positions
+        pos = self.precision.cast(positions)
+        self.diffs = pos[:, np.newaxis] - pos
+        self.dists_sq = np.einsum('ijk,ijk->ij', self.diffs, self.diffs)
+        dists = np.sqrt(self.dists_sq)
+        self.dist_sum = dists.sum(dtype=self.precision.accumulate)  # For the emergent sigma (mean over d > 0)
+        self.dist_count = np.count_nonzero(dists)
+
+    @property
+    def N(self):
+        return len(self.dists_sq)
+
+    def extend(self, positions):
+        """Append rows/columns for defects added at the end of positions."""
+        n_old, n_new = self.N, len(positions)
+        pos = self.precision.cast(positions)
+        dtype = self.precision.storage
+        new_diffs = pos[n_old:, np.newaxis] - pos  # (k, N', d)
+        new_sq = np.einsum('ijk,ijk->ij', new_diffs, new_diffs)
+        diffs = np.empty((n_new, n_new, positions.shape[1]), dtype=dtype)
+        diffs[:n_old, :n_old] = self.diffs
+        diffs[n_old:] = new_diffs
+        diffs[:n_old, n_old:] = -new_diffs[:, :n_old].transpose(1, 0, 2)
+        dists_sq = np.empty((n_new, n_new), dtype=dtype)
+        dists_sq[:n_old, :n_old] = self.dists_sq
+        dists_sq[n_old:] = new_sq
+        dists_sq[:n_old, n_old:] = new_sq[:, :n_old].T
+        new_dists = np.sqrt(new_sq)
+        acc = self.precision.accumulate
+        self.dist_sum += 2 * new_dists.sum(dtype=acc) - new_dists[:, n_old:].sum(dtype=acc)
+        self.dist_count += 2 * np.count_nonzero(new_dists) - np.count_nonzero(new_dists[:, n_old:])
+        self.diffs, self.dists_sq, self.positions = diffs, dists_sq, positions
+
+    def emergent_sigma(self):
+        return self.dist_sum / self.dist_count / np.sqrt(2) if self.dist_count else 1.0
+
+    def weighted_diff_sum(self, w, axis=1):
+        """sum_j w_ij (r_i - r_j) for axis=1, or sum_i w_ij (r_i - r_j) for axis=0."""
+        return self.precision.weighted_diff_sum(self.precision.cast(w), self.diffs, axis)
+
+
+class NumpyBackend:
+    """The vectorized reference path over a PairGeometry cache."""
+
+    name = 'numpy'
+
+    def __init__(self, precision='double', profiler=None):
+        self.precision = get_precision(precision)
+        self.profiler = NULL_PROFILER if profiler is None else profiler
+
+    def pair_terms(self, geom, E, sigma, repulsion=True):
+        """Gradient (N, d) of Phi plus repulsion, the kernel (N, N) and Phi (N,)."""
+        prec = self.precision
+        kernel = np.exp(-geom.dists_sq / prec.storage.type(2 * sigma**2))
+        Phi = prec.matvec(kernel, E)
+        grad = -geom.weighted_diff_sum(kernel * prec.cast(E)[np.newaxis, :]) / sigma**2
+
+        # Repulsion
+        if repulsion:
+            dists = np.sqrt(geom.dists_sq + prec.storage.type(1e-8))
+            min_dist = prec.mean(dists) / 10  # every entry is > 0 after the 1e-8 floor
+            rep_strength = np.mean(E)
+            rep_w = np.where(dists < min_dist, 1 / dists**3, prec.storage.type(0))
+            grad += rep_strength * geom.weighted_diff_sum(prec.cast(E)[:, np.newaxis] * rep_w, axis=0)
+
+        return grad, kernel, Phi
+
+    def fields(self, positions, E, repulsion=True, previous=None):
+        """sigma, Phi and grad; pass the tick's earlier fields after a spawn
+        to extend their geometry by the new rows/columns only."""
+        prof = self.profiler
+        with prof.phase('sigma'):
+            if previous is None:
+                geom = PairGeometry(positions, self.precision)
+            else:
+                geom = previous['geom']
+                geom.extend(positions)
+            sigma = geom.emergent_sigma() if geom.N > 1 else 1.0
+        with prof.phase('field'):
+            grad, kernel, Phi = self.pair_terms(geom, E, sigma, repulsion)
+        prof.count('pairs', geom.N**2)
+        return {'sigma': sigma, 'Phi': Phi, 'grad': grad, 'geom': geom, 'kernel': kernel}
+
+    def finish(self, fields):
+        """Add 'swirl', 'n_close' and 'I_avg' for the tick's final fields."""
+        geom, kernel = fields['geom'], fields['kernel']
+        with self.profiler.phase('spin'):
+            inv_d2 = 1 / (geom.dists_sq + self.precision.storage.type(1e-8))
+            fields['swirl'] = geom.weighted_diff_sum(inv_d2)  # sum_j (r_i - r_j) / (d_ij^2 + 1e-8)
+        with self.profiler.phase('energy'):
+            fields['n_close'] = np.sum(kernel > 0.5, axis=1)
+            fields['I_avg'] = self.precision.mean(kernel**2)  # exp(-d^2 / sigma^2) is the kernel squared
+        return fields
+
+    def nearest(self, fields, parents):
+        """Nearest other defect of each parent, from the cached distances."""
+        rows = fields['geom'].dists_sq[parents]
+        rows[np.arange(len(parents)), parents] = np.inf  # Exclude self
+        return np.argmin(rows, axis=1)
+
+    def close(self):
+        pass
+
+
+# ── Fused loops (compiled when Numba is installed) ───────────────────
+@_jit
+def _pair_moments(pos):
+    # Per row: sum of d over d > 0, their count, and sum of sqrt(d^2 + 1e-8)
+    n, dims = pos.shape
+    dist_sum = np.zeros(n)
+    dist_count = np.zeros(n, dtype=np.int64)
+    floor_sum = np.zeros(n)
+    for i in prange(n):
+        for j in range(n):
+            d2 = 0.0
+            for k in range(dims):
+                diff = pos[i, k] - pos[j, k]
+                d2 += diff * diff
+            if d2 > 0.0:
+                dist_sum[i] += math.sqrt(d2)
+                dist_count[i] += 1
+            floor_sum[i] += math.sqrt(d2 + 1e-8)
+    return dist_sum, dist_count, floor_sum
+
+
+@_jit
+def _pair_fields(pos, E, sigma, min_dist, repulsion):
+    # Every per-row sum of the tick in one sweep over the partners j
+    n, dims = pos.shape
+    inv_two_s2 = 1.0 / (2.0 * sigma * sigma)
+    Phi = np.zeros(n)
+    attract = np.zeros((n, dims))  # sum_j k_ij E_j (r_i - r_j)
+    repel = np.zeros((n, dims))    # sum_j E_j (r_j - r_i) / d_ij^3 for d_ij < min_dist
+    swirl = np.zeros((n, dims))
+    n_close = np.zeros(n, dtype=np.int64)
+    k2_sum = np.zeros(n)
+    for i in prange(n):
+        for j in range(n):
+            d2 = 0.0
+            for k in range(dims):
+                diff = pos[i, k] - pos[j, k]
+                d2 += diff * diff
+            kern = math.exp(-d2 * inv_two_s2)
+            Phi[i] += kern * E[j]
+            k2_sum[i] += kern * kern
+            if kern > 0.5:
+                n_close[i] += 1
+            dist = math.sqrt(d2 + 1e-8)
+            rep_w = E[j] / dist**3 if repulsion and dist < min_dist else 0.0
+            inv_d2 = 1.0 / (d2 + 1e-8)
+            for k in range(dims):
+                diff = pos[i, k] - pos[j, k]
+                attract[i, k] += kern * E[j] * diff
+                repel[i, k] -= rep_w * diff
+                swirl[i, k] += inv_d2 * diff
+    return Phi, attract, repel, swirl, n_close, k2_sum
+
+
+@_jit
+def _nearest(pos, parents):
+    n, dims = pos.shape
+    out = np.empty(len(parents), dtype=np.int64)
+    for a in prange(len(parents)):
+        p = parents[a]
+        best, arg = np.inf, p
+        for j in range(n):
+            if j == p:
+                continue
+            d2 = 0.0
+            for k in range(dims):
+                diff = pos[p, k] - pos[j, k]
+                d2 += diff * diff
+            if d2 < best:
+                best, arg = d2, j
+        out[a] = arg
+    return out
+
+
+class NumbaBackend:
+    """Fused O(N)-memory loops; needs Numba to be fast (see module docstring).
+
+    Always float64: with no pairwise arrays there is nothing for a
+    precision policy to shrink.
+    """
+
+    name = 'numba'
+
+    def __init__(self, precision='double', profiler=None):
+        self.precision = get_precision(precision)
+        self.profiler = NULL_PROFILER if profiler is None else profiler
+
+    def fields(self, positions, E, repulsion=True, previous=None):
+        pos = np.ascontiguousarray(positions, dtype=np.float64)
+        E = np.ascontiguousarray(E, dtype=np.float64)
+        n = len(pos)
+        prof = self.profiler
+        with prof.phase('sigma'):
+            dist_sum, dist_count, floor_sum = _pair_moments(pos)
+            count = dist_count.sum()
+            sigma = dist_sum.sum() / count / np.sqrt(2) if n > 1 and count else 1.0
+            min_dist = floor_sum.sum() / max(n * n, 1) / 10
+        with prof.phase('field'):  # Swirl, counts and I_avg come out of the same sweep
+            Phi, attract, repel, swirl, n_close, k2_sum = _pair_fields(pos, E, sigma, min_dist, repulsion)
+            grad = -attract / sigma**2
+            if repulsion:
+                grad += np.mean(E) * repel
+        prof.count('pairs', n * n)
+        return {'sigma': sigma, 'Phi': Phi, 'grad': grad, 'swirl': swirl, 'n_close': n_close,
+                'I_avg': k2_sum.sum() / max(n * n, 1), 'positions': pos}
+
+    def finish(self, fields):
+        return fields  # Everything came out of the fused pass
+
+    def nearest(self, fields, parents):
+        return _nearest(fields['positions'], np.asarray(parents, dtype=np.int64))
+
+    def close(self):
+        pass
+
+
+# ── Row tiles for worker processes ───────────────────────────────────
+def _row_blocks(n, dims, lo, hi, max_bytes=2**25):
+    # Sub-tiles of rows lo:hi keeping the (rows, n, dims) diffs under max_bytes
+    step = max(1, max_bytes // max(1, 8 * n * dims))
+    for start in range(lo, hi, step):
+        yield slice(start, min(start + step, hi))
+
+
+def _moments_tile(arrays, n, lo, hi, params):
+    # _pair_moments for rows lo:hi
+    pos = arrays['positions'][:n]
+    for rows in _row_blocks(n, pos.shape[1], lo, hi):
+        diffs = pos[rows, np.newaxis] - pos
+        d2 = np.einsum('ijk,ijk->ij', diffs, diffs)
+        arrays['dist_sum'][rows] = np.sqrt(d2).sum(axis=1)
+        arrays['dist_count'][rows] = np.count_nonzero(d2, axis=1)
+        arrays['floor_sum'][rows] = np.sqrt(d2 + 1e-8).sum(axis=1)
+
+
+def _fields_tile(arrays, n, lo, hi, params):
+    # _pair_fields for rows lo:hi; params: sigma, min_dist, repulsion
+    sigma, min_dist, repulsion = params[:3]
+    pos, E = arrays['positions'][:n], arrays['E'][:n]
+    for rows in _row_blocks(n, pos.shape[1], lo, hi):
+        diffs = pos[rows, np.newaxis] - pos
+        d2 = np.einsum('ijk,ijk->ij', diffs, diffs)
+        kern = np.exp(-d2 / (2 * sigma**2))
+        arrays['Phi'][rows] = kern @ E
+        arrays['k2_sum'][rows] = np.einsum('ij,ij->i', kern, kern)
+        arrays['n_close'][rows] = np.count_nonzero(kern > 0.5, axis=1)
+        arrays['attract'][rows] = np.einsum('ij,ijk->ik', kern * E, diffs)
+        dist = np.sqrt(d2 + 1e-8)
+        rep_w = np.where(dist < min_dist, E / dist**3, 0.0) if repulsion else np.zeros_like(d2)
+        arrays['repel'][rows] = -np.einsum('ij,ijk->ik', rep_w, diffs)
+        arrays['swirl'][rows] = np.einsum('ij,ijk->ik', 1 / (d2 + 1e-8), diffs)
+
+
+class ParallelBackend:
+    """The fused backend's two passes as NumPy row tiles on worker processes.
+
+    The pool (parallel.ParallelExecutor) starts on the first tick, grows
+    with N and stays up until close(). n_workers defaults to the CPU
+    count. Always float64, like 'numba'.
+    """
+
+    name = 'parallel'
+
+    def __init__(self, precision='double', profiler=None, n_workers=None):
+        self.precision = get_precision(precision)
+        self.profiler = NULL_PROFILER if profiler is None else profiler
+        self.n_workers = n_workers
+        self.executor = None
+
+    def _executor(self, n, dims):
+        if self.executor is not None and self.executor.fields['positions'][0] != (dims,):
+            self.close()
+        if self.executor is None:
+            from simulations.parallel import ParallelExecutor
+            vector, scalar = ((dims,), float), ((), float)
+            fields = {'positions': vector, 'E': scalar, 'dist_sum': scalar, 'dist_count': ((), np.int64),
+                      'floor_sum': scalar, 'Phi': scalar, 'attract': vector, 'repel': vector,
+                      'swirl': vector, 'n_close': ((), np.int64), 'k2_sum': scalar}
+            self.executor = ParallelExecutor({'moments': _moments_tile, 'fields': _fields_tile},
+                                             fields, max(n, 16), self.n_workers)
+        self.executor.reserve(n)
+        return self.executor
+
+    def fields(self, positions, E, repulsion=True, previous=None):
+        pos = np.asarray(positions, dtype=np.float64)
+        n, dims = pos.shape
+        executor = self._executor(n, dims)
+        out = executor.arrays
+        prof = self.profiler
+        with prof.phase('sigma'):
+            out['positions'][:n] = pos
+            out['E'][:n] = E
+            executor.run('moments', n)
+            count = out['dist_count'][:n].sum()
+            sigma = out['dist_sum'][:n].sum() / count / np.sqrt(2) if n > 1 and count else 1.0
+            min_dist = out['floor_sum'][:n].sum() / max(n * n, 1) / 10
+        with prof.phase('field'):
+            executor.run('fields', n, (sigma, min_dist, float(repulsion)))
+            grad = -out['attract'][:n] / sigma**2
+            if repulsion:
+                grad += np.mean(E) * out['repel'][:n]
+        prof.count('pairs', n * n)
+        return {'sigma': sigma, 'Phi': out['Phi'][:n].copy(), 'grad': grad, 'swirl': out['swirl'][:n].copy(),
+                'n_close': out['n_close'][:n].copy(), 'I_avg': out['k2_sum'][:n].sum() / max(n * n, 1),
+                'positions': pos}
+
+    def finish(self, fields):
+        return fields  # Everything came out of the two passes
+
+    def nearest(self, fields, parents):
+        pos = fields['positions']
+        d2 = np.sum((pos[parents, np.newaxis] - pos)**2, axis=-1)
+        d2[np.arange(len(parents)), parents] = np.inf  # Exclude self
+        return np.argmin(d2, axis=1)
+
+    def close(self):
+        """Stop the worker pool (a later tick starts a new one)."""
+        if self.executor is not None:
+            self.executor.close()
+            self.executor = None
+
+
+# ── Fast Gauss transform ─────────────────────────────────────────────
+def _swirl_tree(pos, theta, leafsize=16, block=4096):
+    # sum_j (r_i - r_j) / (d_ij^2 + 1e-8) by Barnes-Hut over a kd-tree: a node
+    # whose radius is under theta times its distance acts through its count
+    # and quadrupole about its centroid, otherwise its children (or, at a
+    # leaf, its members) are visited. Walked one level at a time for a
+    # block of targets at once. The kernel f(r) = r / s, s = |r|^2 + 1e-8,
+    # expanded about the centroid: the dipole term vanishes and with
+    # Q = sum (x - c)(x - c)^T the next one is
+    # -2 Q r / s^2 - tr(Q) r / s^2 + 4 (r.Q r) r / s^3
+    from simulations.gauss_transform import kd_tree, node_stats
+
+    n, dims = pos.shape
+    perm, start, end, children = kd_tree(pos, max(1, n // leafsize))
+    centroids, radius = node_stats(pos, perm, start, end)
+    counts = end - start
+    sorted_pos = pos[perm]
+    outer = np.concatenate([np.zeros((1, dims, dims)),
+                            np.cumsum(sorted_pos[:, :, np.newaxis] * sorted_pos[:, np.newaxis], axis=0)])
+    Q = outer[end] - outer[start] - counts[:, np.newaxis, np.newaxis] * centroids[:, :, np.newaxis] * centroids[:, np.newaxis]
+    swirl = np.zeros((n, dims))
+    for lo in range(0, n, block):
+        t = np.arange(lo, min(lo + block, n))
+        node = np.zeros(len(t), dtype=np.intp)
+        while len(t):
+            diffs = pos[t] - centroids[node]
+            d2 = np.einsum('ij,ij->i', diffs, diffs)
+            far = radius[node]**2 < theta**2 * d2
+            r, inv_s = diffs[far], 1 / (d2[far] + 1e-8)
+            q = Q[node[far]]
+            Qr = np.einsum('pij,pj->pi', q, r)
+            scale = (counts[node[far]] * inv_s - np.trace(q, axis1=1, axis2=2) * inv_s**2
+                     + 4 * np.einsum('pi,pi->p', r, Qr) * inv_s**3)
+            far_terms = scale[:, np.newaxis] * r - 2 * inv_s[:, np.newaxis]**2 * Qr
+            for k in range(dims):
+                swirl[:, k] += np.bincount(t[far], weights=far_terms[:, k], minlength=n)
+            leaf = ~far & (children[node, 0] < 0)
+            if np.any(leaf):  # Members of near leaves, directly
+                cnt = counts[node[leaf]]
+                offsets = np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+                i = np.repeat(t[leaf], cnt)
+                j = perm[np.repeat(start[node[leaf]], cnt) + offsets]
+                pair_diffs = pos[i] - pos[j]
+                w = 1 / (np.einsum('ij,ij->i', pair_diffs, pair_diffs) + 1e-8)
+                for k in range(dims):
+                    swirl[:, k] += np.bincount(i, weights=w * pair_diffs[:, k], minlength=n)
+            inner = ~far & ~leaf
+            t = np.repeat(t[inner], 2)
+            node = children[node[inner]].ravel()
+    return swirl
+
+
+def _repulsion(pos, E, min_dist, per_target, max_pairs=2**22):
+    # sum_i E_i (r_i - r_j) / dist_ij^3 over dist_ij = sqrt(d^2 + 1e-8) < min_dist,
+    # from kd-tree balls around blocks of targets j (about max_pairs pairs each)
+    from scipy.spatial import cKDTree
+
+    tree = cKDTree(pos)
+    rep = np.zeros_like(pos)
+    step = int(max(1, max_pairs // max(1.0, per_target)))
+    for start in range(0, len(pos), step):
+        targets = np.arange(start, min(start + step, len(pos)))
+        balls = tree.query_ball_point(pos[targets], min_dist, return_sorted=False)
+        lens = np.fromiter(map(len, balls), dtype=np.intp, count=len(balls))
+        i = np.fromiter(itertools.chain.from_iterable(balls), dtype=np.intp, count=lens.sum())
+        j = np.repeat(targets, lens)
+        diffs = pos[i] - pos[j]
+        dists = np.sqrt(np.einsum('ij,ij->i', diffs, diffs) + 1e-8)
+        w = np.where(dists < min_dist, E[i] / dists**3, 0)
+        for k in range(pos.shape[1]):
+            rep[:, k] += np.bincount(j, weights=w * diffs[:, k], minlength=len(pos))
+    return rep
+
+
+class GaussTransformBackend:
+    """Near-linear fields for large N via the fast Gauss transform.
+
+    Up to gauss_transform.DIRECT_MAX pairs it is the 'numpy' path exactly.
+    Beyond that nothing pairwise is stored:
+      sigma, the repulsion radius  sampled from `samples` random pairs
+      Phi, grad, I_avg             gauss_transform ('cutoff' for narrow
+                                   kernels, 'fgt' otherwise) to tol per
+                                   unit weight
+      repulsion                    exact, over kd-tree balls of the
+                                   repulsion radius (mean distance / 10,
+                                   so still ~N^2 / 10^d pairs)
+      swirl                        Barnes-Hut over a kd-tree, opening
+                                   angle theta
+      n_close                      counted against `samples` random defects
+                                   and scaled by N / samples
+    The random draws come from a fixed seed every tick, so runs (and
+    resumed runs) stay reproducible and the engine's rng is untouched.
+    Always float64.
+    """
+
+    name = 'fgt'
+
+    def __init__(self, precision='double', profiler=None, tol=1e-6, theta=0.5, samples=4096, seed=0):
+        self.precision = get_precision(precision)
+        self.profiler = NULL_PROFILER if profiler is None else profiler
+        self.tol = tol
+        self.theta = theta
+        self.samples = samples
+        self.seed = seed
+        self.reference = NumpyBackend(precision, profiler)
+
+    def fields(self, positions, E, repulsion=True, previous=None):
+        from simulations.gauss_transform import DIRECT_MAX, gauss_transform
+
+        pos = np.asarray(positions, dtype=np.float64)
+        n = len(pos)
+        if n * n <= DIRECT_MAX:
+            return self.reference.fields(positions, E, repulsion, previous if previous and 'geom' in previous else None)
+        prof = self.profiler
+        rng = np.random.default_rng(self.seed)
+        with prof.phase('sigma'):
+            # Uniform over all N^2 ordered pairs, self pairs included, as the dense means are
+            i, j = rng.integers(n, size=(2, self.samples * 16))
+            d2 = np.sum((pos[i] - pos[j])**2, axis=1)
+            sigma = np.mean(np.sqrt(d2[d2 > 0])) / np.sqrt(2) if np.any(d2 > 0) else 1.0
+            min_dist = np.mean(np.sqrt(d2 + 1e-8)) / 10
+        with prof.phase('field'):
+            out = gauss_transform(pos, E, sigma, tol=self.tol)
+            grad = out['grad']
+            if repulsion:
+                per_target = n * np.mean(np.sqrt(d2 + 1e-8) < min_dist)  # Expected ball size
+                grad += np.mean(E) * _repulsion(pos, E, min_dist, per_target)
+        prof.count('pairs', n * n)
+        return {'sigma': sigma, 'Phi': out['G'], 'grad': grad, 'positions': pos, 'method': out['method']}
+
+    def finish(self, fields):
+        """Add 'swirl', 'n_close' and 'I_avg' (see the class docstring)."""
+        if 'geom' in fields:
+            return self.reference.finish(fields)
+        from simulations.gauss_transform import gauss_transform
+
+        pos, sigma = fields['positions'], fields['sigma']
+        n = len(pos)
+        with self.profiler.phase('spin'):
+            fields['swirl'] = _swirl_tree(pos, self.theta)
+        with self.profiler.phase('energy'):
+            sample = np.random.default_rng(self.seed).choice(n, min(n, self.samples), replace=False)
+            reach_sq = 2 * sigma**2 * np.log(2)  # kernel > 0.5
+            n_close = np.empty(n)
+            for rows in _row_blocks(len(sample), pos.shape[1], 0, n):
+                d2 = np.sum((pos[rows, np.newaxis] - pos[sample])**2, axis=-1)
+                n_close[rows] = np.count_nonzero(d2 < reach_sq, axis=1)
+            fields['n_close'] = n_close * (n / len(sample))
+            # exp(-d^2 / sigma^2) is the Gauss kernel of width sigma / sqrt(2)
+            G = gauss_transform(pos, np.ones(n), sigma / np.sqrt(2), tol=self.tol, gradient=False)['G']
+            fields['I_avg'] = G.sum() / (n * n)
+        return fields
+
+    def nearest(self, fields, parents):
+        if 'geom' in fields:
+            return self.reference.nearest(fields, parents)
+        from scipy.spatial import cKDTree
+
+        pos = fields['positions']
+        _, idx = cKDTree(pos).query(pos[parents], k=2)
+        return np.where(idx[:, 0] == parents, idx[:, 1], idx[:, 0])  # Skip self (coincident twins tie)
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    'numpy': NumpyBackend,
+    'numba': NumbaBackend,
+    'parallel': ParallelBackend,
+    'fgt': GaussTransformBackend,
+}
+
+
+def available_backends():
+    """Backend names usable here ('numba' only when Numba imports)."""
+    return tuple(name for name in BACKENDS if name != 'numba' or numba is not None)
+
+
+def get_backend(backend='auto', precision='double', profiler=None):
+    """A backend instance by name; 'auto' prefers 'numba' and falls back to 'numpy'.
+
+    profiler: a profiler.Profiler timing the 'sigma' and 'field' passes.
+    """
+    if not isinstance(backend, str):
+        return backend
+    if backend == 'auto':
+        backend = 'numba' if numba is not None else 'numpy'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; choose from {('auto',) + tuple(BACKENDS)}")
+    if backend == 'numba' and numba is None:
+        raise ValueError("The 'numba' backend needs Numba installed; use 'auto' to fall back to 'numpy'")
+    return BACKENDS[backend](precision, profiler)
@@ -0,0 +1,400 @@
+"""Scaling benchmarks for the simulation hot paths.
+
+Every registered case times one kernel over a ladder of sizes N (10 to
+10^5 in half decades), each dimension it supports (1, 2, 3) and each
+dtype (float64, and float32 where the kernel takes a precision policy;
+see precision.py). Per point it records the median and best wall time
+per call and the peak RSS. Per series (case, dims, dtype) it fits the
+empirical exponent p of t ~ N^p on the points slow enough to be out of
+the per-call overhead. A series stops growing N once the predicted time
+or memory of the next point passes the budget, so O(N^2) kernels skip
+the sizes that would take minutes or not fit.
+
+Points run one at a time, each in a fresh spawned process by default, so
+peak RSS belongs to that point alone and no case inherits another's
+caches. Results are plain JSON; compare() matches a run against a
+baseline and flags points slower (or hungrier) than a threshold.
+
+    python -m simulations.benchmarks --max-n 10000 --out bench.json
+    python -m simulations.benchmarks --out new.json --baseline bench.json --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulations import particles_3d
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = (10, 31, 100, 316, 1000, 3162, 10000, 31623, 100000)
+DTYPES = {'float64': 'double', 'float32': 'mixed'}  # dtype -> precision policy
+
+CASES = {}
+
+
+def case(name, dims=(3,), dtypes=('float64',), expected=None, memory=None):
+    """Register setup(n, dims, dtype, rng) -> zero-argument callable as a case.
+
+    expected: the exponent the kernel should show (used to predict the next
+    point's cost before the series has its own fit). memory(n, dims,
+    itemsize): bytes the kernel allocates, when it grows faster than N.
+    """
+    def register(setup):
+        CASES[name] = {'setup': setup, 'dims': tuple(dims), 'dtypes': tuple(dtypes),
+                       'expected': expected, 'memory': memory}
+        return setup
+    return register
+
+
+def _pairwise_bytes(n, dims, itemsize):
+    # (N, N, d) diffs plus a few (N, N) arrays alive at once
+    return n * n * (dims + 4) * itemsize
+
+
+# ── Cases ─────────────────────────────────────────────────────────────
+@case('physics.compute_force', expected=1)
+def _compute_force(n, dims, dtype, rng):
+    physics = particles_3d.load('physics')
+    positions, energies, ranges = particles_3d.random_particles(n, rng)
+    return lambda: physics.compute_force(0, positions, energies, ranges)
+
+
+@case('physics.compute_forces', dtypes=tuple(DTYPES), expected=2)
+def _compute_forces(n, dims, dtype, rng):
+    physics = particles_3d.load('physics')
+    positions, energies, ranges = particles_3d.random_particles(n, rng)
+    return lambda: physics.compute_forces(positions, energies, ranges, precision=DTYPES[dtype])
+
+
+@case('field_sampler.sample_field', expected=1)
+def _sample_field(n, dims, dtype, rng):
+    field_sampler = particles_3d.load('field_sampler')
+    positions, energies, ranges = particles_3d.random_particles(n, rng)
+    return lambda: field_sampler.sample_field(positions, energies, ranges, grid_size=6)
+
+
+@case('field_sampler.sample_field_fast', expected=1)
+def _sample_field_fast(n, dims, dtype, rng):
+    field_sampler = particles_3d.load('field_sampler')
+    positions, energies, ranges = particles_3d.random_particles(n, rng)
+    return lambda: field_sampler.sample_field_fast(positions, energies, ranges, grid_size=50)
+
+
+@case('tick_engine.tick', dtypes=tuple(DTYPES), expected=2)
+def _tick_engine_tick(n, dims, dtype, rng):
+    tick_engine = particles_3d.load('tick_engine')
+    positions, energies, ranges = particles_3d.random_particles(n, rng)
+    state = [positions, rng.uniform(-0.2, 0.2, (n, 3))]
+
+    def run():
+        state[:] = tick_engine.tick(*state, energies, ranges, precision=DTYPES[dtype])
+    return run
+
+
+def _engine(n, dims, dtype):
+    from simulations.vdm_engine import VDMEngine
+    # max_N = N: no spawns, so every timed tick sees the same N
+    return VDMEngine(dims=dims, N_initial=n, steps=1, max_N=n, precision=DTYPES[dtype])
+
+
+@case('VDMEngine.tick', dims=(2, 3), dtypes=tuple(DTYPES), expected=2, memory=_pairwise_bytes)
+def _vdm_tick(n, dims, dtype, rng):
+    engine = _engine(n, dims, dtype)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):  # Cohesion messages
+            engine.tick()
+    return run
+
+
+@case('VDMEngine.compute_Phi_and_grad', dims=(1, 2, 3), dtypes=tuple(DTYPES), expected=2,
+      memory=_pairwise_bytes)
+def _vdm_phi(n, dims, dtype, rng):
+    engine = _engine(n, dims, dtype)
+    return lambda: engine.compute_Phi_and_grad(engine.positions, engine.E, 1.0)
+
+
+@case('VDMEngine.bound_state_spectra', dims=(1,), expected=1)
+def _bound_states(n, dims, dtype, rng):
+    # The uncached solve behind bound_state_spectra, N being the grid size
+    from simulations.spectrum import solve_levels
+    return lambda: solve_levels(10.0, 2.0, (-40.0, 40.0, n), k=min(11, n))
+
+
+def _automaton(backend):
+    def setup(n, dims, dtype, rng):
+        from simulations.cellular_automaton import CellularAutomaton
+        side = max(3, int(round(np.sqrt(n))))  # N is the number of cells
+        ca = CellularAutomaton(rng.random((side, side)) < 0.3, boundary='periodic', backend=backend)
+        return lambda: ca.step()
+    return setup
+
+
+for _backend in ('dense', 'packed', 'sparse'):
+    case(f'CellularAutomaton.step[{_backend}]', dims=(2,), expected=1)(_automaton(_backend))
+
+
+@case('clustering.track_cluster_counts', dims=(1, 2, 3), expected=1)
+def _track_clusters(n, dims, dtype, rng):
+    clustering = particles_3d.load('clustering')
+    # Constant density (about 5 neighbors within eps), 5 frames of small steps
+    eps = 0.3
+    side = (n * (2 * eps)**dims / 5) ** (1 / dims)
+    frames = [rng.uniform(0, side, (n, dims))]
+    for _ in range(4):
+        frames.append(frames[-1] + rng.normal(0, 0.02, (n, dims)))
+    return lambda: clustering.track_cluster_counts(frames, eps=eps)
+
+
+@case('fractal.box_pyramid', dims=(1, 2, 3), expected=1)
+def _box_pyramid(n, dims, dtype, rng):
+    from simulations.fractal import box_pyramid
+    points = rng.uniform(0, 1, (n, dims))
+    return lambda: box_pyramid(points, box=1.0)
+
+
+# ── Measurement ───────────────────────────────────────────────────────
+def _rss_bytes():
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def time_call(fn, min_time=0.2, max_repeats=50):
+    """Per-call wall times of fn: one warm-up call, then repeats filling min_time.
+
+    A first call longer than min_time is kept as the only sample.
+    """
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    if first >= min_time:
+        return [first]
+    times = []
+    for _ in range(int(np.clip(min_time / max(first, 1e-9), 1, max_repeats))):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def measure(name, n, dims, dtype, min_time=0.2, seed=0):
+    """Time one point of a case; returns its result row."""
+    spec = CASES[name]
+    rss_before = _rss_bytes()
+    fn = spec['setup'](n, dims, dtype, np.random.default_rng(seed))
+    times = time_call(fn, min_time)
+    return {'case': name, 'n': n, 'dims': dims, 'dtype': dtype,
+            'median': float(np.median(times)), 'best': float(np.min(times)), 'repeats': len(times),
+            'peak_rss': _rss_bytes(), 'rss_growth': _rss_bytes() - rss_before}
+
+
+def fit_exponent(ns, times, min_time=1e-3):
+    """Slope of log t against log N over the points taking at least min_time.
+
+    Faster points are mostly call overhead; with fewer than two slow ones
+    the largest three are used. Returns None for fewer than two points.
+    """
+    ns, times = np.asarray(ns, dtype=float), np.asarray(times, dtype=float)
+    slow = times >= min_time
+    use = slow if slow.sum() >= 2 else np.arange(len(ns)) >= len(ns) - 3
+    if use.sum() < 2:
+        return None
+    return float(np.polyfit(np.log(ns[use]), np.log(times[use]), 1)[0])
+
+
+def _physical_memory():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return 8 * 2**30
+
+
+def _skip_reason(spec, rows, n, dims, dtype, max_seconds, max_bytes):
+    # Predict the next point from the last one measured in this series
+    if spec['memory'] is not None:
+        need = spec['memory'](n, dims, np.dtype(dtype).itemsize)
+        if need > max_bytes:
+            return f"N={n} needs ~{need / 2**30:.1f} GiB"
+    if rows:
+        last = rows[-1]
+        fitted = fit_exponent([r['n'] for r in rows], [r['median'] for r in rows])
+        exponent = max(fitted or 0.0, spec['expected'] or 1.0)
+        predicted = last['median'] * (n / last['n']) ** exponent
+        if predicted > max_seconds:
+            return f"N={n} predicted at {predicted:.0f} s per call"
+    return None
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'system': platform.system(), 'cpus': os.cpu_count()}
+
+
+def run_suite(cases=None, sizes=SIZES, dims=None, dtypes=None, max_seconds=10.0, max_bytes=None,
+              min_time=0.2, isolate=True, log=print):
+    """Run every series of the chosen cases; returns {'meta', 'results', 'fits'}.
+
+    cases, dims and dtypes filter what runs (default: everything each case
+    supports). A series stops at the first N predicted to take more than
+    max_seconds per call or to need more than max_bytes (default half the
+    physical memory); the skipped sizes are listed with the reason. With
+    isolate, each point runs in its own spawned process.
+    """
+    names = list(CASES) if cases is None else list(cases)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown cases {unknown}; choose from {tuple(CASES)}")
+    max_bytes = max_bytes or _physical_memory() // 2
+    results, fits = [], []
+    pool = (ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                max_tasks_per_child=1) if isolate else None)
+    try:
+        for name in names:
+            spec = CASES[name]
+            for d in spec['dims']:
+                if dims is not None and d not in dims:
+                    continue
+                for dtype in spec['dtypes']:
+                    if dtypes is not None and dtype not in dtypes:
+                        continue
+                    rows, skipped = [], None
+                    for n in sorted(sizes):
+                        skipped = skipped or _skip_reason(spec, rows, n, d, dtype, max_seconds, max_bytes)
+                        if skipped:
+                            results.append({'case': name, 'n': n, 'dims': d, 'dtype': dtype,
+                                            'skipped': skipped})
+                            continue
+                        if pool is None:
+                            row = measure(name, n, d, dtype, min_time)
+                        else:
+                            row = pool.submit(measure, name, n, d, dtype, min_time).result()
+                        rows.append(row)
+                        log(f"{name} d={d} {dtype} N={n}: {row['median'] * 1e3:.3f} ms, "
+                            f"peak RSS {row['peak_rss'] / 2**20:.0f} MiB")
+                    results += rows
+                    exponent = fit_exponent([r['n'] for r in rows], [r['median'] for r in rows])
+                    fits.append({'case': name, 'dims': d, 'dtype': dtype, 'exponent': exponent,
+                                 'expected': spec['expected'],
+                                 'n_range': [rows[0]['n'], rows[-1]['n']] if rows else None})
+                    if exponent is not None:
+                        log(f"{name} d={d} {dtype}: t ~ N^{exponent:.2f}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {'meta': _metadata(), 'results': results, 'fits': fits}
+
+
+# ── Results and baselines ─────────────────────────────────────────────
+def save(suite, path):
+    with open(path, 'w') as f:
+        json.dump(suite, f, indent=1)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _key(row):
+    return row['case'], row.get('n'), row['dims'], row['dtype']
+
+
+def compare(baseline, current, threshold=0.25, min_time=1e-3):
+    """Points of current slower than baseline by more than threshold.
+
+    Rows are matched on (case, n, dims, dtype). Times are medians; points
+    under min_time in the baseline are too noisy to judge and are left
+    out. Peak RSS growth beyond the threshold is flagged the same way, and
+    so is a fitted exponent more than threshold above the baseline's over
+    the same range of N.
+    Returns {'regressions', 'improvements', 'matched'}.
+    """
+    base = {_key(r): r for r in baseline['results'] if 'median' in r}
+    regressions, improvements, matched = [], [], 0
+    for row in current['results']:
+        old = base.get(_key(row))
+        if old is None or 'median' not in row:
+            continue
+        matched += 1
+        entry = {'case': row['case'], 'n': row['n'], 'dims': row['dims'], 'dtype': row['dtype']}
+        if old['median'] >= min_time:
+            ratio = row['median'] / old['median']
+            if ratio > 1 + threshold:
+                regressions.append({**entry, 'metric': 'time', 'ratio': ratio})
+            elif ratio < 1 / (1 + threshold):
+                improvements.append({**entry, 'metric': 'time', 'ratio': ratio})
+        if old.get('rss_growth', 0) > 16 * 2**20 and row['rss_growth'] > (1 + threshold) * old['rss_growth']:
+            regressions.append({**entry, 'metric': 'rss', 'ratio': row['rss_growth'] / old['rss_growth']})
+    base_fits = {(f['case'], f['dims'], f['dtype']): f for f in baseline.get('fits', [])}
+    for fit in current.get('fits', []):
+        old = base_fits.get((fit['case'], fit['dims'], fit['dtype']))
+        if old is None or old['n_range'] != fit['n_range'] or None in (old['exponent'], fit['exponent']):
+            continue
+        if fit['exponent'] > old['exponent'] + threshold:
+            regressions.append({'case': fit['case'], 'n': None, 'dims': fit['dims'],
+                                'dtype': fit['dtype'], 'metric': 'exponent',
+                                'ratio': fit['exponent'] - old['exponent']})
+    return {'regressions': regressions, 'improvements': improvements, 'matched': matched}
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m simulations.benchmarks',
+                                     description='Scaling benchmarks for the simulation hot paths.')
+    parser.add_argument('--cases', help='comma-separated case names (default: all)')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    parser.add_argument('--max-n', type=int, default=max(SIZES))
+    parser.add_argument('--dims', help='comma-separated dimensions, e.g. 2,3')
+    parser.add_argument('--dtypes', help='comma-separated dtypes: float64,float32')
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='per-call time budget')
+    parser.add_argument('--min-time', type=float, default=0.2, help='timing window per point')
+    parser.add_argument('--no-isolate', action='store_true', help='run points in this process')
+    parser.add_argument('--out', help='write results JSON here')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown fraction')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, spec in CASES.items():
+            print(f"{name}: dims {spec['dims']}, dtypes {spec['dtypes']}, expected N^{spec['expected']}")
+        return 0
+    suite = run_suite(cases=args.cases.split(',') if args.cases else None,
+                      sizes=[n for n in SIZES if n <= args.max_n],
+                      dims=[int(d) for d in args.dims.split(',')] if args.dims else None,
+                      dtypes=args.dtypes.split(',') if args.dtypes else None,
+                      max_seconds=args.max_seconds, min_time=args.min_time,
+                      isolate=not args.no_isolate)
+    if args.out:
+        save(suite, args.out)
+    if args.baseline:
+        report = compare(load(args.baseline), suite, args.threshold)
+        for r in report['regressions']:
+            change = f"+{r['ratio']:.2f}" if r['metric'] == 'exponent' else f"x{r['ratio']:.2f}"
+            print(f"REGRESSION {r['case']} d={r['dims']} {r['dtype']} N={r['n']}: {r['metric']} {change}")
+        print(f"{report['matched']} points compared, {len(report['regressions'])} regressions, "
+              f"{len(report['improvements'])} improvements")
+        return 1 if report['regressions'] else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main())
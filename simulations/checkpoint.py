@@ -0,0 +1,189 @@
+"""Checkpoint and restart for long simulation runs.
+
+A checkpoint is one .npz file: the state arrays (positions, velocities,
+E, S, packed history, ...) plus a JSON header with the tick, the run
+parameters and the exact random generator state (bit_generator.state for
+np.random.Generator, get_state() for the legacy global one). Any arrays
+inside the generator state (the MT19937 key) go in as arrays, so nothing
+is rounded through text and a resumed run continues bit for bit.
+
+Files are written to a temporary name, fsynced and renamed over the
+previous checkpoint, so a crash mid-write always leaves the last complete
+one. Checkpointer does the writing on a background thread: the tick loop
+only copies the O(N) state and hands it over; if a newer snapshot arrives
+before the previous one started writing, the older one is dropped.
+
+    ckpt = Checkpointer('run.ckpt.npz', every=100)
+    ...
+    if ckpt.due(t):
+        ckpt.submit(arrays, meta)
+    ckpt.close()
+    arrays, meta = load('run.ckpt.npz')
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+VERSION = 1
+_META = '__meta__'
+
+
+# ── Format ────────────────────────────────────────────────────────────
+def encode(obj, arrays, prefix):
+    """obj with every ndarray moved into arrays (named by prefix and key path), for the JSON header."""
+    if isinstance(obj, np.ndarray):
+        arrays[prefix] = obj
+        return {'__array__': prefix}
+    if isinstance(obj, dict):
+        return {k: encode(v, arrays, f'{prefix}.{k}') for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [encode(v, arrays, f'{prefix}.{i}') for i, v in enumerate(obj)]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def decode(obj, arrays):
+    """Inverse of encode."""
+    if isinstance(obj, dict):
+        if set(obj) == {'__array__'}:
+            return arrays[obj['__array__']]
+        return {k: decode(v, arrays) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [decode(v, arrays) for v in obj]
+    return obj
+
+
+def pack_frames(frames, prefix='history'):
+    """A list of (N_t, d) frames as {prefix_rows: all rows, prefix_ends: cumulative N}."""
+    ends = np.cumsum([len(f) for f in frames], dtype=np.int64)
+    rows = np.concatenate(frames) if frames else np.empty((0, 0))
+    return {f'{prefix}_rows': rows, f'{prefix}_ends': ends}
+
+
+def unpack_frames(arrays, prefix='history'):
+    """Inverse of pack_frames; frames are independent copies."""
+    rows, ends = arrays[f'{prefix}_rows'], arrays[f'{prefix}_ends']
+    return [f.copy() for f in np.split(rows, ends[:-1])] if len(ends) else []
+
+
+def save(path, arrays, meta):
+    """Atomically write arrays and a JSON-able meta dict to path (.npz)."""
+    header = json.dumps({'version': VERSION, **meta}).encode()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        np.savez(f, **{_META: np.frombuffer(header, dtype=np.uint8)}, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:  # Make the rename itself durable
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def load(path):
+    """(arrays, meta) from a checkpoint written by save()."""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files if name != _META}
+        meta = json.loads(data[_META].tobytes().decode())
+    if meta.get('version') != VERSION:
+        raise ValueError(f"Checkpoint {path} has version {meta.get('version')}, expected {VERSION}")
+    return arrays, meta
+
+
+# ── Background writer ─────────────────────────────────────────────────
+class Checkpointer:
+    """Periodic checkpoints written off the tick loop.
+
+    every: checkpoint interval in ticks (see due()). submit() takes the
+    state already copied by the caller; prepare, if given, is called on
+    the writer thread and returns extra arrays (for work like packing a
+    long history that shouldn't stall the loop). With background=False
+    writes happen inline. Errors on the thread are raised by the next
+    submit(), wait() or close().
+    """
+
+    def __init__(self, path, every=100, background=True):
+        self.path = path
+        self.every = every
+        self.background = background
+        self.written = 0
+        self.last_tick = None
+        self._pending = None
+        self._busy = False
+        self._error = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._loop, name='checkpoint-writer', daemon=True)
+            self._thread.start()
+
+    def due(self, tick):
+        return bool(self.every) and tick % self.every == 0
+
+    def _write(self, job):
+        arrays, meta, prepare = job
+        if prepare is not None:
+            arrays = {**arrays, **prepare()}
+        save(self.path, arrays, meta)
+        self.written += 1
+        self.last_tick = meta.get('t')
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                job, self._pending, self._busy = self._pending, None, True
+            try:
+                self._write(job)
+            except Exception as exc:  # Surfaced on the caller's side
+                self._error = exc
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _raise(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Writing checkpoint {self.path} failed") from error
+
+    def submit(self, arrays, meta, prepare=None):
+        """Queue a snapshot; it replaces one that hasn't started writing yet."""
+        self._raise()
+        if not self.background:
+            self._write((arrays, meta, prepare))
+            return
+        with self._cond:
+            self._pending = (arrays, meta, prepare)
+            self._cond.notify_all()
+
+    def wait(self):
+        """Block until every submitted snapshot is on disk."""
+        if self.background:
+            with self._cond:
+                while self._pending is not None or self._busy:
+                    self._cond.wait()
+        self._raise()
+
+    def close(self):
+        self.wait()
+        if self._thread is not None and not self._closed:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self._thread.join()
+        self._closed = True
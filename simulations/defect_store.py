@@ -0,0 +1,125 @@
+"""Growable structure-of-arrays storage for defect state.
+
+Spawning engines used to np.vstack/np.append every field on every accepted
+spawn, which reallocates all N rows each time. DefectStore keeps each field
+(positions, velocities, E, S, ...) in a buffer with spare capacity that
+doubles when full, so appending k defects costs O(k) amortized. view()
+returns the first n rows of a buffer without copying; views are
+invalidated when a growth reallocates, so fetch them again after append().
+
+Removed defects go on a free-list and their slots are reused by the next
+append; until then they stay in the views, flagged by `alive`. Call
+compact() to close the holes when a contiguous live block is needed.
+"""
+
+import numpy as np
+
+
+class DefectStore:
+    """SoA buffers with capacity doubling, an active count and a free-list.
+
+        store = DefectStore(positions=pos, velocities=vel, E=E)
+        store.append(positions=new_pos, velocities=new_vel, E=new_E)
+        positions = store.view('positions')   # (n, d), zero-copy
+    """
+
+    def __init__(self, capacity=None, **fields):
+        if not fields:
+            raise ValueError("DefectStore needs at least one field")
+        initial = {name: np.asarray(values) for name, values in fields.items()}
+        n = {len(values) for values in initial.values()}
+        if len(n) != 1:
+            raise ValueError(f"Fields have different lengths: {n}")
+        self.n = n.pop()
+        capacity = max(capacity or 0, self.n, 16)
+        self._buffers = {}
+        for name, values in initial.items():
+            buf = np.empty((capacity,) + values.shape[1:], dtype=values.dtype)
+            buf[:self.n] = values
+            self._buffers[name] = buf
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:self.n] = True
+        self._free = []
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def capacity(self):
+        return len(self._alive)
+
+    @property
+    def fields(self):
+        return tuple(self._buffers)
+
+    @property
+    def alive(self):
+        return self._alive[:self.n]
+
+    @property
+    def n_alive(self):
+        return self.n - len(self._free)
+
+    def view(self, name):
+        return self._buffers[name][:self.n]
+
+    def views(self, *names):
+        return tuple(self.view(name) for name in names)
+
+    def reserve(self, capacity):
+        """Grow every buffer to at least `capacity` rows."""
+        if capacity <= self.capacity:
+            return
+        for name, buf in self._buffers.items():
+            grown = np.empty((capacity,) + buf.shape[1:], dtype=buf.dtype)
+            grown[:self.n] = buf[:self.n]
+            self._buffers[name] = grown
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.n] = self._alive[:self.n]
+        self._alive = alive
+
+    def append(self, **rows):
+        """Add k defects (one value per field, leading dim k); returns their slots.
+
+        Free slots are filled first (lowest first), the rest go at the end.
+        """
+        if set(rows) != set(self._buffers):
+            raise ValueError(f"append needs exactly the fields {sorted(self._buffers)}")
+        rows = {name: np.asarray(values) for name, values in rows.items()}
+        k = len(next(iter(rows.values())))
+        reused = sorted(self._free)[:k]
+        self._free = sorted(self._free)[k:]
+        n_tail = k - len(reused)
+        if self.n + n_tail > self.capacity:
+            self.reserve(max(2 * self.capacity, self.n + n_tail))
+        slots = np.concatenate([np.array(reused, dtype=np.intp),
+                                np.arange(self.n, self.n + n_tail)])
+        self.n += n_tail
+        for name, values in rows.items():
+            self._buffers[name][slots] = values
+        self._alive[slots] = True
+        return slots
+
+    def remove(self, indices):
+        """Mark defects dead and put their slots on the free-list."""
+        indices = np.unique(np.asarray(indices, dtype=np.intp))
+        indices = indices[self._alive[indices]]
+        self._alive[indices] = False
+        self._free.extend(indices.tolist())
+
+    def compact(self):
+        """Move live rows to the front; returns their previous slot indices."""
+        keep = np.flatnonzero(self.alive)
+        for buf in self._buffers.values():
+            buf[:len(keep)] = buf[keep]
+        self.n = len(keep)
+        self._alive[:] = False
+        self._alive[:self.n] = True
+        self._free = []
+        return keep
+
+
+def interleave_pairs(a, b):
+    """Rows a0, b0, a1, b1, ...: the layout spawned pairs are appended in."""
+    a, b = np.asarray(a), np.asarray(b)
+    return np.stack([a, b], axis=1).reshape((2 * len(a),) + a.shape[1:])
@@ -0,0 +1,170 @@
+"""Time integrators for the defect dynamics.
+
+The engines advance x'' = a(x) with the semi-implicit Euler update
+    v += dt a(x);  x += dt v
+which is first order, so bound pairs only stay bound at small dt.
+Integrator swaps in a better scheme behind the same step(x, v) call:
+
+    'euler'     the update above, kept to reproduce existing runs
+    'verlet'    velocity Verlet (kick-drift-kick leapfrog): second order,
+                symplectic, and one force evaluation per step, since the
+                closing acceleration is reused to open the next step
+    'yoshida4'  Yoshida's fourth-order composition of three Verlet steps
+                (three evaluations per step, much larger stable dt)
+    'block'     Verlet with block timesteps: each step dt is split per
+                defect into dt / 2^level, with the level set by the
+                defect's acceleration and speed, so only tightly bound,
+                fast-turning defects are substepped; the rest get one
+                kick per step
+
+accel(x) returns the acceleration for positions of shape (..., N, d), so a
+batch of systems steps as one array. The block scheme also calls
+accel(x, idx) for the defects idx only (the last-but-one axis). Random
+forcing goes in as a velocity `kick` per step, added where the Euler
+update adds it, so 'euler' with kick=dt*noise is the old update exactly.
+
+Given a potential(x), energy() and drift() report the total energy
+(unit masses) and its relative change since the first measurement.
+
+    integ = Integrator(accel, dt=0.05, method='verlet', potential=U)
+    for _ in range(n):
+        x, v = integ.step(x, v)
+    print(integ.force_evals, integ.drift(x, v))
+"""
+
+import numpy as np
+
+METHODS = ('euler', 'verlet', 'yoshida4', 'block')
+
+# Yoshida (1990) fourth-order weights: w1, w0, w1 with 2 w1 + w0 = 1
+_CBRT2 = 2 ** (1 / 3)
+YOSHIDA4 = (1 / (2 - _CBRT2), -_CBRT2 / (2 - _CBRT2), 1 / (2 - _CBRT2))
+
+
+def kinetic_energy(v):
+    """sum 1/2 |v|^2 over the last two axes (one value per system)."""
+    return 0.5 * np.sum(np.asarray(v)**2, axis=(-2, -1))
+
+
+def _defect_max(x):
+    # |x| per defect, the largest over any leading batch axes
+    mag = np.linalg.norm(x, axis=-1)
+    return mag.reshape(-1, mag.shape[-1]).max(axis=0)
+
+
+def timestep_levels(a, v, dt, eta=0.02, scale=1.0, max_level=6):
+    """Block level of each defect: its step is dt / 2^level.
+
+    The wanted step is eta min(sqrt(scale / |a|), scale / |v|), scale being
+    the interaction length: a defect neither turns nor travels far across
+    a well in one step. In a batch (..., N, d) a defect takes its largest
+    |a| and |v|.
+    """
+    with np.errstate(divide='ignore'):
+        wanted = eta * np.minimum(np.sqrt(scale / _defect_max(a)), scale / _defect_max(v))
+        level = np.ceil(np.log2(dt / wanted))
+    return np.clip(np.nan_to_num(level, nan=0.0, neginf=0.0), 0, max_level).astype(int)
+
+
+class Integrator:
+    """Steps (x, v) under accel with one of METHODS.
+
+    The last acceleration is cached and reused while the positions passed
+    in equal the ones last returned; modifying them in place (e.g. a
+    renormalization) just triggers a fresh evaluation. force_evals counts
+    evaluations in whole-system units (a block substep touching a quarter
+    of the defects counts 0.25). Block options: eta, scale, max_level (see
+    timestep_levels).
+    """
+
+    def __init__(self, accel, dt, method='verlet', potential=None, eta=0.02, scale=1.0, max_level=6):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method!r}; choose from {METHODS}")
+        self.accel = accel
+        self.dt = dt
+        self.method = method
+        self.potential = potential
+        self.eta = eta
+        self.scale = scale
+        self.max_level = max_level
+        self.force_evals = 0.0
+        self.energy0 = None
+        self._x = None
+        self._a = None
+
+    def reset(self):
+        """Forget the cached acceleration and the reference energy."""
+        self._x = self._a = None
+        self.energy0 = None
+
+    def _accel(self, x):
+        if self._a is None or self._x.shape != x.shape or not np.array_equal(self._x, x):
+            self._a = self.accel(x)
+            self.force_evals += 1
+        return self._a
+
+    def _remember(self, x, a):
+        self._x = x.copy()
+        self._a = a
+        return x
+
+    def step(self, x, v, kick=None):
+        """Advance one dt; returns new (x, v) arrays, the inputs are untouched."""
+        x = np.array(x, dtype=float)
+        v = np.array(v, dtype=float)
+        a = self._accel(x)
+        if self.method == 'euler':
+            v += self.dt * a
+            if kick is not None:
+                v += kick
+            x += self.dt * v
+            self._x = self._a = None
+            return x, v
+        if kick is not None:
+            v += kick
+        if self.method == 'block':
+            return self._block(x, v, a)
+        weights = YOSHIDA4 if self.method == 'yoshida4' else (1.0,)
+        for w in weights:
+            h = w * self.dt
+            v += 0.5 * h * a
+            x += h * v
+            a = self.accel(x)
+            self.force_evals += 1
+            v += 0.5 * h * a
+        return self._remember(x, a), v
+
+    def _block(self, x, v, a):
+        # KDK leapfrog per level on a grid of 2^max_level substeps. Levels are
+        # fixed for the whole step, so every defect is synchronized at its end.
+        a = a.copy()
+        n = x.shape[-2]
+        level = timestep_levels(a, v, self.dt, self.eta, self.scale, self.max_level)
+        n_sub = 2 ** int(level.max())
+        h = self.dt / n_sub
+        period = 2 ** (level.max() - level)  # Substeps per own step
+        own_dt = (period * h)[:, np.newaxis]
+        v += 0.5 * own_dt * a
+        for s in range(1, n_sub + 1):
+            x += h * v
+            idx = np.flatnonzero(s % period == 0)
+            if len(idx) == 0:
+                continue
+            a_idx = a[..., idx, :] = self.accel(x, idx)
+            self.force_evals += len(idx) / n
+            # Close this own step; open the next one unless the big step ends
+            v[..., idx, :] += (0.5 if s == n_sub else 1.0) * own_dt[idx] * a_idx
+        return self._remember(x, a), v
+
+    def energy(self, x, v):
+        """Kinetic plus potential energy (needs a potential)."""
+        if self.potential is None:
+            raise ValueError("energy() needs the Integrator's potential")
+        return kinetic_energy(v) + self.potential(x)
+
+    def drift(self, x, v):
+        """|E - E0| / |E0|, E0 being the energy at the first call since reset()."""
+        e = self.energy(x, v)
+        if self.energy0 is None:
+            self.energy0 = e
+        return np.abs(e - self.energy0) / np.maximum(np.abs(self.energy0), 1e-300)
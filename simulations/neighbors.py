@@ -0,0 +1,191 @@
+"""Neighbor search for finite-range Gaussian defect interactions.
+
+Every kernel in the model is a Gaussian, so pairs further apart than a few
+widths contribute less than float precision. The helpers here turn an error
+tolerance into a cutoff radius and return the (i, j) pairs inside it, using
+either a uniform cell list or scipy's cKDTree (which also handles a different
+cutoff per source defect, as with the per-particle `ranges` in particles_3d).
+VerletList reuses a pair list across ticks until defects have moved far
+enough to leave the skin.
+
+Pairs are returned as two index arrays (i, j) listing every ordered pair
+i != j, so per-target sums are a single np.bincount over i.
+"""
+
+import itertools
+
+import numpy as np
+
+
+def gaussian_cutoff(sigma, tol):
+    """Radius beyond which exp(-d^2 / (2 sigma^2)) < tol."""
+    return np.asarray(sigma, dtype=float) * np.sqrt(2 * np.log(1 / tol))
+
+
+def range_cutoff(ranges, tol):
+    """Radius beyond which exp(-2 R^2 d^2) < tol (particles_3d kernel)."""
+    return np.sqrt(np.log(1 / tol) / 2) / np.asarray(ranges, dtype=float)
+
+
+def _as_points(positions):
+    pos = np.asarray(positions, dtype=float)
+    return pos[:, np.newaxis] if pos.ndim == 1 else pos
+
+
+def _empty_pairs():
+    return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+
+def _filter_pairs(pos, i, j, cutoff):
+    # Keep pairs with |r_i - r_j| < cutoff[j]; a scalar cutoff applies to all
+    d = pos[i] - pos[j]
+    d2 = np.einsum('ij,ij->i', d, d)
+    rc = cutoff[j] if np.ndim(cutoff) else cutoff
+    keep = d2 < rc * rc
+    return i[keep], j[keep]
+
+
+def cell_list_pairs(positions, cutoff):
+    """All ordered pairs closer than cutoff using a uniform cell list.
+
+    Cells have edge max(cutoff), so each defect only checks the 3^d cells
+    around its own. Only occupied cells are stored, so sparse clouds in a
+    large box cost nothing extra. An array cutoff is read per source j.
+    """
+    pos = _as_points(positions)
+    n, dims = pos.shape
+    if n < 2:
+        return _empty_pairs()
+    edge = float(np.max(cutoff))
+    coords = np.floor((pos - pos.min(axis=0)) / edge).astype(np.int64) + 1
+    shape = coords.max(axis=0) + 2  # one empty layer each side, so offsets never wrap
+    strides = np.cumprod(np.r_[1, shape[:-1]]).astype(np.int64)
+    cell = coords @ strides
+
+    order = np.argsort(cell, kind='stable')
+    occupied, start, count = np.unique(cell[order], return_index=True, return_counts=True)
+
+    pairs_i, pairs_j = [], []
+    for offset in itertools.product((-1, 0, 1), repeat=dims):
+        target = cell + np.dot(offset, strides)
+        k = np.minimum(np.searchsorted(occupied, target), len(occupied) - 1)
+        src = np.nonzero(occupied[k] == target)[0]
+        if len(src) == 0:
+            continue
+        cnt = count[k[src]]
+        first = np.repeat(start[k[src]], cnt)
+        within = np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+        i = np.repeat(src, cnt)
+        j = order[first + within]
+        keep = i != j
+        i, j = _filter_pairs(pos, i[keep], j[keep], cutoff)
+        pairs_i.append(i)
+        pairs_j.append(j)
+    if not pairs_i:
+        return _empty_pairs()
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+
+def kdtree_pairs(positions, cutoff):
+    """All ordered pairs closer than cutoff[j] using scipy's cKDTree.
+
+    The ball around each source j has its own radius, so widely varying
+    per-defect ranges don't inflate the search to the largest one.
+    """
+    from scipy.spatial import cKDTree
+
+    pos = _as_points(positions)
+    n = len(pos)
+    if n < 2:
+        return _empty_pairs()
+    radii = np.broadcast_to(np.asarray(cutoff, dtype=float), (n,))
+    balls = cKDTree(pos).query_ball_point(pos, r=radii, return_sorted=False)
+    lens = np.fromiter(map(len, balls), dtype=np.intp, count=n)
+    i = np.fromiter(itertools.chain.from_iterable(balls), dtype=np.intp, count=lens.sum())
+    j = np.repeat(np.arange(n), lens)
+    keep = i != j
+    return i[keep], j[keep]
+
+
+BACKENDS = {
+    'cell': cell_list_pairs,
+    'kdtree': kdtree_pairs,
+}
+
+
+def find_pairs(positions, cutoff, backend='auto'):
+    """Dispatch to a registered backend; 'auto' picks kdtree for per-defect cutoffs."""
+    if backend == 'auto':
+        backend = 'kdtree' if np.ndim(cutoff) and np.ptp(cutoff) > 0 else 'cell'
+    return BACKENDS[backend](positions, cutoff)
+
+
+class VerletList:
+    """Pair list built with cutoff + skin and reused until a defect moves skin/2.
+
+    `cutoff` may be a scalar or one radius per defect (read per source j).
+    Call pairs(positions) every tick; it only rebuilds when needed, when N
+    changes (spawns), or after invalidate().
+    """
+
+    def __init__(self, cutoff, skin=0.1, backend='auto'):
+        self.cutoff = cutoff
+        self.skin = skin
+        self.backend = backend
+        self.rebuilds = 0
+        self._ref = None
+        self._pairs = _empty_pairs()
+
+    def set_cutoff(self, cutoff):
+        self.cutoff = cutoff
+        self.invalidate()
+
+    def invalidate(self):
+        self._ref = None
+
+    def needs_rebuild(self, positions):
+        if self._ref is None or self._ref.shape != positions.shape:
+            return True
+        moved = np.sqrt(np.max(np.sum((positions - self._ref)**2, axis=-1)))
+        return 2 * moved > self.skin
+
+    def pairs(self, positions):
+        pos = _as_points(positions)
+        if self.needs_rebuild(pos):
+            self._pairs = find_pairs(pos, np.asarray(self.cutoff) + self.skin, self.backend)
+            self._ref = pos.copy()
+            self.rebuilds += 1
+        return self._pairs
+
+    def state_dict(self):
+        """Arrays holding the current list and its reference positions
+        (for checkpoints: rebuilding instead would change which pairs the
+        resumed run sees, and with them the forces)."""
+        state = {'i': self._pairs[0], 'j': self._pairs[1], 'rebuilds': np.int64(self.rebuilds)}
+        if self._ref is not None:
+            state['ref'] = self._ref
+        return state
+
+    def load_state(self, state):
+        self._pairs = (np.asarray(state['i'], dtype=np.intp), np.asarray(state['j'], dtype=np.intp))
+        self._ref = state.get('ref')
+        self.rebuilds = int(state['rebuilds'])
+
+
+def gaussian_pair_sums(positions, E, sigma, i, j):
+    """Phi, grad and kernel for exp(-d^2 / (2 sigma^2)) over a pair list.
+
+    Matches the dense kernels in VDMEngine/defect_cascade, except that the
+    self term (kernel 1, zero gradient) is left to the caller. Returns
+    Phi (N,), grad (N, d) and the kernel value for every pair.
+    """
+    pos = _as_points(positions)
+    n, dims = pos.shape
+    diffs = pos[i] - pos[j]
+    kernel = np.exp(-np.einsum('ij,ij->i', diffs, diffs) / (2 * sigma**2))
+    w = E[j] * kernel
+    Phi = np.bincount(i, weights=w, minlength=n)
+    grad = np.empty((n, dims))
+    for k in range(dims):
+        grad[:, k] = -np.bincount(i, weights=w * diffs[:, k], minlength=n) / sigma**2
+    return Phi, grad, kernel
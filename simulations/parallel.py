@@ -0,0 +1,327 @@
+"""Shared-memory multi-process executor for the pairwise force passes.
+
+NumPy's elementwise pairwise work (exp, einsum over (rows, N, d) tiles)
+runs on one core however it is vectorized. A ParallelExecutor keeps the
+per-defect arrays (positions, E, ranges, forces, ...) in
+multiprocessing.shared_memory blocks and a persistent pool of spawned
+workers attached to them. A call splits rows 0..n into one contiguous
+tile per worker; every worker runs the same kernel on its tile, writing
+its rows of the outputs in place, and a barrier closes the call. Nothing
+is pickled per call: the kernel index, n and a few float parameters go
+through a small shared control block.
+
+Kernels are plain module-level functions kernel(arrays, n, lo, hi,
+params), passed as the function or as 'package.module:function'; the
+workers import them (from the function's file when its module isn't
+importable there, as with the particles_3d sources). arrays maps every
+field to its full-capacity buffer. Spatial decompositions (x-slabs with
+a halo of neighboring sources within the cutoff) are up to the kernel:
+with everything in shared memory a slab reads its halo straight from the
+other slabs' rows, so there is no explicit exchange. Blocks grow by
+doubling when n passes the capacity and the workers re-attach.
+
+    executor = ParallelExecutor({'forces': forces_tile},
+                                {'positions': ((3,), float), 'forces': ((3,), float)}, capacity=n)
+    executor.arrays['positions'][:n] = positions
+    executor.run('forces', n)
+    forces = executor.arrays['forces'][:n].copy()
+    executor.close()
+
+scaling() times a call for a ladder of worker counts and reports speedup
+and parallel efficiency; `python -m simulations.parallel` runs it on the
+particles_3d forces and VDMEngine's 'parallel' backend.
+"""
+
+import importlib
+import importlib.util
+import inspect
+import multiprocessing
+import os
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_RUN, _ATTACH, _EXIT = 1, 2, 3
+_HEADER = 3  # command, n, kernel index; then one error flag per worker
+MAX_PARAMS = 8
+
+
+def kernel_spec(kernel):
+    """(module, function, source file or None) locating a kernel for the workers."""
+    if isinstance(kernel, str):
+        module, _, name = kernel.partition(':')
+        return module, name, None
+    return kernel.__module__, kernel.__name__, inspect.getsourcefile(kernel)
+
+
+def resolve(spec):
+    """The kernel function of a kernel_spec()."""
+    module, name, path = spec
+    try:
+        mod = importlib.import_module(module)
+    except ImportError:
+        if path is None:
+            raise
+        loader = importlib.util.spec_from_file_location(module, path)
+        mod = importlib.util.module_from_spec(loader)
+        loader.loader.exec_module(mod)
+    return getattr(mod, name)
+
+
+def _attach(layout):
+    # {field: (block name, shape, dtype)} -> ({field: ndarray}, [SharedMemory])
+    arrays, blocks = {}, []
+    for field, (name, shape, dtype) in layout.items():
+        block = shared_memory.SharedMemory(name=name)
+        arrays[field] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        blocks.append(block)
+    return arrays, blocks
+
+
+def _worker(w, n_workers, kernels, layout, start, done, conn):
+    # Worker loop: wait at the start barrier, act on the control block, meet at done
+    try:
+        funcs = [resolve(spec) for spec in kernels]
+        arrays, blocks = _attach(layout)
+    except Exception:
+        conn.send(traceback.format_exc())
+        return
+    conn.send(None)  # Ready
+    try:
+        while True:
+            start.wait()
+            control, params = arrays['__control__'], arrays['__params__']
+            command, n, k = (int(x) for x in control[:_HEADER])
+            if command == _EXIT:
+                break
+            if command == _ATTACH:
+                arrays = control = params = None  # Drop the views before closing their blocks
+                for block in blocks:
+                    block.close()
+                arrays, blocks = _attach(conn.recv())
+            elif command == _RUN:
+                lo, hi = n * w // n_workers, n * (w + 1) // n_workers
+                try:
+                    if hi > lo:
+                        funcs[k](arrays, n, lo, hi, params)
+                except Exception:
+                    control[_HEADER + w] = 1
+                    conn.send(traceback.format_exc())
+            done.wait()
+    finally:
+        arrays = control = params = None
+        for block in blocks:
+            block.close()
+
+
+class ParallelExecutor:
+    """Persistent worker pool over per-defect arrays in shared memory.
+
+    kernels: {name: function or 'module:function'}. fields: {field: (row
+    shape, dtype)}, each allocated with `capacity` rows. n_workers defaults to the CPU
+    count. timeout (seconds) bounds each barrier wait, so a dead worker
+    raises threading.BrokenBarrierError instead of hanging; None waits
+    forever.
+    """
+
+    def __init__(self, kernels, fields, capacity=1024, n_workers=None, timeout=None):
+        self.kernel_names = tuple(kernels)
+        self.fields = {name: (tuple(shape), np.dtype(dtype)) for name, (shape, dtype) in fields.items()}
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.capacity = 0
+        self.calls = 0
+        self._blocks = {}
+        self.arrays = {}
+        ctx = multiprocessing.get_context('spawn')
+        self._start = ctx.Barrier(self.n_workers + 1)
+        self._done = ctx.Barrier(self.n_workers + 1)
+        self._control = shared_memory.SharedMemory(create=True, size=(_HEADER + self.n_workers) * 8)
+        self._params = shared_memory.SharedMemory(create=True, size=MAX_PARAMS * 8)
+        self.control = np.ndarray(_HEADER + self.n_workers, dtype=np.int64, buffer=self._control.buf)
+        self.params = np.ndarray(MAX_PARAMS, dtype=np.float64, buffer=self._params.buf)
+        self.control[:] = 0
+        self._allocate(max(1, capacity))
+        self._conns, self._procs = [], []
+        for w in range(self.n_workers):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker, name=f'parallel-worker-{w}', daemon=True,
+                               args=(w, self.n_workers, [kernel_spec(kernels[k]) for k in self.kernel_names],
+                                     self._layout(), self._start, self._done, child))
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        for w, conn in enumerate(self._conns):  # Startup errors surface here, not as a hang
+            try:
+                error = conn.recv()
+            except EOFError:
+                self._procs[w].join()
+                error = f"exited with code {self._procs[w].exitcode}"
+            if error is not None:
+                self._abort()
+                raise RuntimeError(f"Parallel worker {w} failed to start:\n{error}")
+
+    def _allocate(self, capacity):
+        old = self._blocks
+        self.arrays, self._blocks = {}, {}
+        for name, (shape, dtype) in self.fields.items():
+            size = max(1, capacity * int(np.prod(shape, dtype=np.int64)) * dtype.itemsize)
+            block = shared_memory.SharedMemory(create=True, size=size)
+            array = np.ndarray((capacity,) + shape, dtype=dtype, buffer=block.buf)
+            if name in old:  # Keep the rows already written
+                rows = min(self.capacity, capacity)
+                array[:rows] = np.ndarray((self.capacity,) + shape, dtype=dtype, buffer=old[name].buf)[:rows]
+            self.arrays[name] = array
+            self._blocks[name] = block
+        for block in old.values():
+            block.close()
+            block.unlink()
+        self.capacity = capacity
+
+    def _layout(self):
+        layout = {name: (block.name, self.arrays[name].shape, self.arrays[name].dtype.str)
+                  for name, block in self._blocks.items()}
+        layout['__control__'] = (self._control.name, self.control.shape, self.control.dtype.str)
+        layout['__params__'] = (self._params.name, self.params.shape, self.params.dtype.str)
+        return layout
+
+    def _sync(self, command):
+        self.control[0] = command
+        self._start.wait(self.timeout)
+        if command != _EXIT:
+            self._done.wait(self.timeout)
+
+    def reserve(self, n):
+        """Grow the blocks to hold n rows (doubling) and re-attach the workers."""
+        if n <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < n:
+            capacity *= 2
+        self._allocate(capacity)
+        layout = self._layout()
+        for conn in self._conns:
+            conn.send(layout)
+        self._sync(_ATTACH)
+
+    def run(self, kernel, n, params=()):
+        """Run a kernel over rows 0..n split across the workers; blocks until all finish."""
+        if kernel not in self.kernel_names:
+            raise ValueError(f"Unknown kernel {kernel!r}; choose from {self.kernel_names}")
+        if n > self.capacity:
+            raise ValueError(f"n={n} exceeds the capacity {self.capacity}; call reserve() first")
+        if len(params) > MAX_PARAMS:
+            raise ValueError(f"At most {MAX_PARAMS} params, got {len(params)}")
+        self.params[:len(params)] = params
+        self.control[1:] = 0
+        self.control[1], self.control[2] = n, self.kernel_names.index(kernel)
+        self._sync(_RUN)
+        self.calls += 1
+        failed = np.flatnonzero(self.control[_HEADER:])
+        if len(failed):
+            tracebacks = [self._conns[w].recv() for w in failed]
+            raise RuntimeError(f"Kernel {kernel!r} failed in worker {failed[0]}:\n{tracebacks[0]}")
+
+    def close(self):
+        if not self._procs:
+            return
+        try:
+            self._sync(_EXIT)
+            for proc in self._procs:
+                proc.join(timeout=5)
+        except Exception:  # A broken barrier: the workers are gone or stuck
+            pass
+        self._abort()
+
+    def _abort(self):
+        # Stop whatever workers are left and release the shared memory
+        for proc in self._procs:
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+        for conn in self._conns:
+            conn.close()
+        self._procs, self._conns = [], []
+        self.arrays = {}
+        self.control = self.params = None
+        for block in list(self._blocks.values()) + [self._control, self._params]:
+            block.close()
+            block.unlink()
+        self._blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── Scaling ───────────────────────────────────────────────────────────
+def scaling(make_call, workers=None, min_time=0.5, log=print):
+    """Speedup and parallel efficiency of a call over a ladder of worker counts.
+
+    make_call(n_workers) -> (call, close) sets up one configuration.
+    workers defaults to 1, 2, 4, ... up to the CPU count. Efficiency is
+    t(1) / (w t(w)). Returns {'workers', 'times', 'speedup', 'efficiency'}.
+    """
+    if workers is None:
+        cpus = os.cpu_count() or 1
+        workers = sorted({2**k for k in range(cpus.bit_length()) if 2**k <= cpus} | {cpus})
+    times = []
+    for w in workers:
+        call, close = make_call(w)
+        try:
+            call()  # Warm-up (imports, first touch of the blocks)
+            samples, start = [], time.perf_counter()
+            while not samples or time.perf_counter() - start < min_time:
+                t0 = time.perf_counter()
+                call()
+                samples.append(time.perf_counter() - t0)
+        finally:
+            close()
+        times.append(float(np.median(samples)))
+        log(f"{w} workers: {times[-1] * 1e3:.2f} ms, speedup {times[0] / times[-1]:.2f}, "
+            f"efficiency {times[0] / (w * times[-1]):.2f}")
+    times = np.array(times)
+    return {'workers': list(workers), 'times': times.tolist(),
+            'speedup': (times[0] / times).tolist(),
+            'efficiency': (times[0] / (np.array(workers) * times)).tolist()}
+
+
+if __name__ == '__main__':
+    import argparse
+    import contextlib
+    import io
+
+    from simulations import particles_3d
+
+    parser = argparse.ArgumentParser(prog='python -m simulations.parallel',
+                                     description='Parallel scaling of the force passes.')
+    parser.add_argument('--n', type=int, default=4000, help='defects')
+    parser.add_argument('--workers', help='comma-separated worker counts (default 1, 2, 4, ... CPUs)')
+    parser.add_argument('--cutoff-tol', type=float, help='particles_3d slab decomposition with this cutoff')
+    args = parser.parse_args()
+    workers = [int(w) for w in args.workers.split(',')] if args.workers else None
+    tick_engine = particles_3d.load('tick_engine')
+    positions, energies, ranges = particles_3d.random_particles(args.n, np.random.default_rng(0))
+
+    def particles(w):
+        executor = tick_engine.force_executor(energies, ranges, w, cutoff_tol=args.cutoff_tol)
+        accel = tick_engine.force_field(energies, ranges, executor=executor)
+        return lambda: accel(positions), executor.close
+
+    def vdm(w):
+        from simulations.backends import ParallelBackend
+        from simulations.vdm_engine import VDMEngine
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = VDMEngine(dims=3, N_initial=args.n, steps=1, max_N=args.n,
+                               backend=ParallelBackend(n_workers=w))
+        return lambda: engine.backend.fields(engine.positions, engine.E), engine.backend.close
+
+    print(f"particles_3d forces, N={args.n}" + (f", cutoff_tol={args.cutoff_tol}" if args.cutoff_tol else ""))
+    scaling(particles, workers)
+    print(f"VDMEngine 'parallel' backend fields, N={args.n}")
+    scaling(vdm, workers)
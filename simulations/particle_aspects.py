@@ -1,8 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation, PillowWriter
-from scipy.sparse import diags
-from scipy.sparse.linalg import eigsh
+from simulations.spectrum import solve_states
 
 # Parameters from paper
 E_i = 1.0  # Defect energy
@@ -49,18 +48,12 @@ def wave(frame, k=0.5):
     omega = np.sqrt(rho0 * k**2)  # Simplified ˆK(k) ≈1 for small k
     return np.sin(2 * np.pi * k * (R - omega * frame / 5.0)) / (R + 1e-6)
 
-# Bound solver (corrected finite diff for -d²/dr² + V)
+# Bound solver (finite diff for -d²/dr² + V, 5 lowest levels)
 def solve_bound():
     N = 1000
     r_max = 10
     dr = r_max / N
-    r = np.linspace(dr/2, r_max - dr/2, N)
-    V = -V0 * np.exp(-r**2 / sigma**2)
-    lower = (1/dr**2) * np.ones(N-1)
-    main = -2/dr**2 * np.ones(N) + V
-    upper = (1/dr**2) * np.ones(N-1)
-    H = diags([lower, main, upper], [-1, 0, 1], shape=(N, N), format='csr')
-    eigenvalues, eigenvectors = eigsh(H, k=5, which='LM', sigma=-V0-1)
+    r, eigenvalues, eigenvectors = solve_states(V0, sigma, (dr/2, r_max - dr/2, N), k=5, width=1.0)
     return r, eigenvalues, eigenvectors.T
 
 # Static bound plot
@@ -74,7 +67,7 @@ ax_bound.set_title('Discrete Mass Spectra (Bound States, Ch2.7)')
 ax_bound.set_xlabel('r')
 ax_bound.set_ylabel('Energy / ψ (scaled)')
 ax_bound.legend()
-plt.savefig('../assets/figures/bound_states.png')
+plt.savefig('assets/figures/bound_states.png')
 plt.close(fig_bound)
 
 # Animation
@@ -111,5 +104,5 @@ def update(frame):
     return [im, quiver]
 
 ani = FuncAnimation(fig, update, frames=70, interval=100, blit=False)
-ani.save('../assets/figures/particle_aspects.gif', writer=PillowWriter(fps=10))
+ani.save('assets/figures/particle_aspects.gif', writer=PillowWriter(fps=10))
 plt.close(fig)
@@ -0,0 +1,37 @@
+"""Access to the particles_3d sources from the simulations package.
+
+The modules in src/ import each other as `simulation.<module>` (the
+package name they had on their own). load() aliases src/ as that package
+when no `simulation` is importable, so benchmarks, tests and
+simulations.parallel can use them without putting src/ on sys.path:
+
+    tick_engine = load('tick_engine')
+    positions, energies, ranges = random_particles(1000, np.random.default_rng(0))
+"""
+
+import importlib
+import os
+import sys
+import types
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+
+def load(module):
+    """simulation.<module> from src/, aliasing the package when needed."""
+    if 'simulation' not in sys.modules:
+        try:
+            import simulation  # noqa: F401
+        except ImportError:
+            package = types.ModuleType('simulation')
+            package.__path__ = [SRC]
+            sys.modules['simulation'] = package
+    return importlib.import_module(f'simulation.{module}')
+
+
+def random_particles(n, rng):
+    """Positions (n, 3) in [-2, 2)^3, energies in [1, 5) and ranges in [0.5, 1.5)."""
+    positions = rng.uniform(-2, 2, (n, 3))
+    energies = rng.uniform(1.0, 5.0, n)
+    ranges = rng.uniform(0.5, 1.5, n)
+    return positions, energies, ranges
@@ -1,18 +1,217 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-from sklearn.cluster import DBSCAN
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from simulations.neighbors import VerletList, find_pairs
+from simulations.trajectory_store import TrajectoryReader
+
+# DBSCAN clusters are the connected components of the eps radius graph over
+# core points (those with >= min_samples points, themselves included, within
+# eps), with each border point joining its lowest-numbered core neighbor's
+# cluster and everything else noise (-1). That is one pair search plus one
+# scipy.sparse.csgraph pass, with labels numbered exactly as
+# sklearn.cluster.DBSCAN numbers them.
+
+def radius_labels(n, i, j, min_samples=2):
+    # DBSCAN labels from the ordered pairs (i, j) closer than eps
+    degree = np.bincount(i, minlength=n) + 1
+    core = degree >= min_samples
+    labels = np.full(n, -1)
+    keep = core[i] & core[j]
+    graph = coo_matrix((np.ones(keep.sum(), dtype=np.int8), (i[keep], j[keep])), shape=(n, n))
+    _, comp = connected_components(graph, directed=False)
+    if not core.any():
+        return labels
+    # Components come out numbered by their lowest node, as DBSCAN's scan
+    # order numbers clusters; renumber over core nodes only
+    _, first = np.unique(comp[core], return_index=True)
+    rank = np.empty(comp.max() + 1, dtype=int)
+    rank[comp[core][np.sort(first)]] = np.arange(len(first))
+    labels[core] = rank[comp[core]]
+    border = ~core[i] & core[j]
+    if border.any():
+        best = np.full(n, np.iinfo(np.int64).max)
+        np.minimum.at(best, i[border], labels[j[border]])
+        hit = best < np.iinfo(np.int64).max
+        labels[hit] = best[hit]
+    return labels
+
+def _pairs_within(positions, i, j, eps):
+    d = positions[i] - positions[j]
+    keep = np.einsum('ij,ij->i', d, d) <= eps * eps
+    return i[keep], j[keep]
+
+def dbscan_labels(positions, eps=0.3, min_samples=2):
+    positions = np.asarray(positions, dtype=float)
+    i, j = find_pairs(positions, eps * (1 + 1e-9))
+    return radius_labels(len(positions), *_pairs_within(positions, i, j, eps), min_samples)
 
 def get_cluster_colors(positions, eps=0.3, min_samples=2):
-    clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(positions)
-    labels = clustering.labels_
-    unique = np.unique(labels)
-    label_map = {lbl: idx for idx, lbl in enumerate(unique)}
-    colors = np.array([label_map[lbl] for lbl in labels])
+    labels = dbscan_labels(positions, eps, min_samples)
+    colors = np.unique(labels, return_inverse=True)[1].reshape(-1)
     return colors.astype(float) / max(1, colors.max()), labels
 
-def track_cluster_counts(trajectory):
-    counts = []
-    for frame in trajectory:
-        _, labels = get_cluster_colors(frame[:, :2])
-        n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-        counts.append(n_clusters)
-    return counts
+def match_clusters(prev_labels, cur_labels):
+    # Overlap counts between the clusters of consecutive frames, over defects
+    # present in both (rows are the same defect; spawns append at the end).
+    # Returns (prev, cur, count) triplets, one per overlapping pair.
+    n = min(len(prev_labels), len(cur_labels))
+    p, c = prev_labels[:n], cur_labels[:n]
+    both = (p >= 0) & (c >= 0)
+    if not both.any():
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0, dtype=int)
+    width = c.max() + 1
+    key, count = np.unique(p[both] * width + c[both], return_counts=True)
+    return key // width, key % width, count
+
+def _best(owner, other, count, size):
+    # For each owner label, the other label with the largest overlap (-1 if
+    # none); ties go to the lowest other label
+    best = np.full(size, -1)
+    order = np.lexsort((other, -count, owner))
+    owner, other = owner[order], other[order]
+    first = np.r_[True, owner[1:] != owner[:-1]] if len(owner) else np.empty(0, dtype=bool)
+    best[owner[first]] = other[first]
+    return best
+
+class ClusterTracker:
+    # Labels every frame and carries persistent cluster ids across frames.
+    # The eps radius graph comes from a VerletList built at eps + skin and
+    # reused until a defect moves skin/2 (or N changes), so most frames only
+    # re-filter the cached candidate pairs. A cluster keeps its id while it
+    # and its predecessor are each other's largest overlap; merges keep the
+    # largest part's id, splits give the smaller parts new ids. events
+    # collects (frame, kind, ids_before, ids_after) with kind one of 'birth',
+    # 'death', 'merge', 'split'.
+    def __init__(self, eps=0.3, min_samples=2, skin=None, dims=2, backend='auto'):
+        self.eps = eps
+        self.min_samples = min_samples
+        self.dims = dims
+        self.neighbors = VerletList(eps * (1 + 1e-9), skin=0.1 * eps if skin is None else skin,
+                                    backend=backend)
+        self.frame = -1
+        self.next_id = 0
+        self.events = []
+        self._labels = np.empty(0, dtype=int)
+        self._ids = np.empty(0, dtype=int)
+
+    def labels(self, positions):
+        pos = np.asarray(positions, dtype=float)[:, :self.dims]
+        i, j = self.neighbors.pairs(pos)
+        return radius_labels(len(pos), *_pairs_within(pos, i, j, self.eps), self.min_samples)
+
+    def update(self, positions):
+        # Cluster one frame; returns the persistent id of every defect (-1 noise)
+        self.frame += 1
+        labels = self.labels(positions)
+        k_prev, k_cur = len(self._ids), labels.max(initial=-1) + 1
+        p, c, count = match_clusters(self._labels, labels)
+        best_pred = _best(c, p, count, k_cur)
+        best_succ = _best(p, c, count, k_prev)
+        ids = np.empty(k_cur, dtype=int)
+        keep = best_pred >= 0
+        keep[keep] = best_succ[best_pred[keep]] == np.flatnonzero(keep)
+        ids[keep] = self._ids[best_pred[keep]]
+        fresh = np.flatnonzero(~keep)
+        ids[fresh] = self.next_id + np.arange(len(fresh))
+        self.next_id += len(fresh)
+
+        n_pred = np.bincount(c, minlength=k_cur)
+        n_succ = np.bincount(p, minlength=k_prev)
+        t = self.frame
+        for a in np.flatnonzero(n_succ == 0):
+            self.events.append((t, 'death', (int(self._ids[a]),), ()))
+        for b in np.flatnonzero(n_pred == 0):
+            self.events.append((t, 'birth', (), (int(ids[b]),)))
+        for b in np.flatnonzero(n_pred > 1):
+            self.events.append((t, 'merge', tuple(int(x) for x in self._ids[p[c == b]]), (int(ids[b]),)))
+        for a in np.flatnonzero(n_succ > 1):
+            self.events.append((t, 'split', (int(self._ids[a]),), tuple(int(x) for x in ids[c[p == a]])))
+
+        self._labels, self._ids = labels, ids
+        out = np.full(len(labels), -1)
+        out[labels >= 0] = ids[labels[labels >= 0]]
+        return out
+
+def _frame_stats(ids):
+    sizes = np.bincount(ids[ids >= 0])
+    sizes = sizes[sizes > 0]
+    return len(sizes), int(np.count_nonzero(ids < 0)), int(sizes.max(initial=0))
+
+def _track_frames(frames, start, tracker):
+    # Per-frame (clusters, noise, largest) plus the ids of the first and last
+    # frames, which the sharded mode needs for stitching
+    stats, first_ids, ids = [], None, None
+    for frame in frames:
+        ids = tracker.update(frame)
+        if first_ids is None:
+            first_ids = ids
+        stats.append(_frame_stats(ids))
+    events = [(start + t, kind, a, b) for t, kind, a, b in tracker.events]
+    return np.array(stats, dtype=int).reshape(-1, 3), events, first_ids, ids, tracker.next_id
+
+def _track_shard(path, start, stop, eps, min_samples, skin, dims):
+    # Frames [start, stop) of a stored trajectory, read one at a time. Every
+    # shard but the first starts one frame early, to overlap the previous one
+    reader = TrajectoryReader(path)
+    lead = 1 if start > 0 else 0
+    tracker = ClusterTracker(eps, min_samples, skin, dims)
+    frames = (reader[t] for t in range(start - lead, stop))
+    return (start, lead) + _track_frames(frames, start - lead, tracker)
+
+def _stitch(shards):
+    # Map each shard's local ids to global ones. Both shards label the
+    # overlap frame identically, so the ids alive there take the previous
+    # shard's ids; the rest are numbered on in order of birth, exactly as a
+    # single tracker would number them. The overlap frame's own rows and
+    # events (all 'birth', as the shard starts empty) are dropped by tick:
+    # an overlap frame without clusters has none, and the shard's first
+    # events then belong to a later frame.
+    all_stats, all_events, next_id, prev_last = [], [], 0, None
+    for start, lead, stats, events, first_ids, last_ids, n_ids in shards:
+        remap = np.full(n_ids, -1)
+        if lead:
+            alive = first_ids >= 0
+            remap[first_ids[alive]] = prev_last[alive]
+            stats = stats[1:]
+            events = [e for e in events if e[0] != start - lead]
+        fresh = np.flatnonzero(remap < 0)
+        remap[fresh] = next_id + np.arange(len(fresh))
+        next_id += len(fresh)
+        all_stats.append(stats)
+        all_events += [(t, kind, tuple(int(remap[x]) for x in a), tuple(int(remap[x]) for x in b))
+                       for t, kind, a, b in events]
+        prev_last = np.where(last_ids >= 0, remap[np.maximum(last_ids, 0)], -1)
+    return np.concatenate(all_stats), all_events, next_id
+
+def track_clusters(trajectory, eps=0.3, min_samples=2, skin=None, dims=2, workers=1, shard_frames=None):
+    # Cluster statistics over a whole trajectory: a list of (N, d) frames, a
+    # TrajectoryReader or a store path (simulations.trajectory_store), read
+    # frame by frame so long runs stream from disk. Clusters use the first
+    # `dims` coordinates (the xy projection by default). Returns a dict of
+    # per-frame 'n_clusters', 'n_noise' and 'largest', the ids' 'events' and
+    # 'n_ids', the number of distinct cluster ids ever used.
+    # workers > 1 shards a stored trajectory into frame ranges on a process
+    # pool and stitches their ids, matching the sequential result exactly.
+    path = trajectory if isinstance(trajectory, str) else getattr(trajectory, 'path', None)
+    if isinstance(trajectory, str):
+        trajectory = TrajectoryReader(trajectory)
+    if workers == 1 or path is None:
+        tracker = ClusterTracker(eps, min_samples, skin, dims)
+        stats, events, _, _, n_ids = _track_frames(iter(trajectory), 0, tracker)
+    else:
+        n = len(TrajectoryReader(path))
+        shard_frames = shard_frames or max(1, -(-n // (4 * workers)))
+        bounds = [(s, min(s + shard_frames, n)) for s in range(0, n, shard_frames)]
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(_track_shard, path, a, b, eps, min_samples, skin, dims)
+                       for a, b in bounds]
+            stats, events, n_ids = _stitch([f.result() for f in futures])
+    return {'n_clusters': stats[:, 0], 'n_noise': stats[:, 1], 'largest': stats[:, 2],
+            'events': events, 'n_ids': n_ids}
+
+def track_cluster_counts(trajectory, eps=0.3, min_samples=2, workers=1):
+    return list(track_clusters(trajectory, eps, min_samples, workers=workers)['n_clusters'])
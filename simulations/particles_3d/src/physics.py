@@ -1,4 +1,5 @@
 import numpy as np
+from simulations.precision import POLICIES, get_precision
 
 def gaussian_kernel(d, R):
     return np.exp(-2 * (R**2) * (d**2))
@@ -25,3 +26,82 @@ def compute_force(i, positions, energies, ranges):
                * np.exp(-2 * (ranges[j]**2) * (d**2))
         force += grad
     return force
+
+def compute_forces(positions, energies, ranges, max_tile_bytes=64 * 2**20, targets=None,
+                   precision='double', cutoff=None):
+    # Batched form of compute_force for all i at once (or only the rows in
+    # targets). Rows are processed in tiles so the (rows, N, 3) temporary
+    # stays under max_tile_bytes. precision 'mixed' (simulations.precision)
+    # builds the tiles in float32 and sums over sources in float64 blocks.
+    # cutoff (one radius per source) drops pairs farther apart than it.
+    prec = get_precision(precision)
+    positions = np.asarray(positions, dtype=float)
+    n = len(positions)
+    pos = prec.cast(positions)
+    rows = pos if targets is None else pos[targets]
+    coeff = prec.cast(-4 * energies * ranges**2)  # per-source prefactor
+    alpha = prec.cast(2 * ranges**2)              # per-source kernel width
+    if cutoff is not None:
+        cutoff_sq = prec.cast(np.asarray(cutoff)**2)
+    forces = np.zeros((len(rows), 3))
+    tile = int(max(1, min(n, max_tile_bytes // max(1, n * 3 * prec.storage.itemsize))))
+    for start in range(0, len(rows), tile):
+        stop = min(start + tile, len(rows))
+        d_vec = rows[start:stop, np.newaxis, :] - pos[np.newaxis, :, :]
+        d2 = np.einsum('ijk,ijk->ij', d_vec, d_vec)
+        # self and coincident pairs have d_vec == 0 and drop out on their own
+        w = coeff[np.newaxis, :] * np.exp(-alpha[np.newaxis, :] * d2)
+        if cutoff is not None:
+            w = np.where(d2 <= cutoff_sq[np.newaxis, :], w, 0)
+        forces[start:stop] = prec.weighted_diff_sum(w, d_vec)
+    return forces
+
+def compute_forces_pairs(positions, energies, ranges, i, j, targets=None, precision='double'):
+    # compute_forces restricted to a neighbor pair list (i, j), e.g. from
+    # simulations.neighbors.VerletList; j is the source of the kernel.
+    # Per-pair terms follow the precision policy; bincount sums in float64.
+    prec = get_precision(precision)
+    if targets is not None:
+        keep = np.zeros(len(positions), dtype=bool)
+        keep[targets] = True
+        keep = keep[i]
+        i, j = i[keep], j[keep]
+    pos = prec.cast(positions)
+    d_vec = pos[i] - pos[j]
+    d2 = np.einsum('ij,ij->i', d_vec, d_vec)
+    w = prec.cast(-4 * energies[j] * ranges[j]**2) * np.exp(prec.cast(-2 * ranges[j]**2) * d2)
+    forces = np.empty((len(positions), 3))
+    for k in range(3):
+        forces[:, k] = np.bincount(i, weights=w * d_vec[:, k], minlength=len(positions))
+    return forces if targets is None else forces[targets]
+
+def forces_tile(arrays, m, lo, hi, params):
+    # simulations.parallel kernel: forces on one worker's tile of rows.
+    # params: the precision policy's index in POLICIES, N, and 1 when the
+    # rows are the m defects in 'targets' rather than all N. All pairs:
+    # rows lo:hi against every source. With an 'order' field, slabs: the
+    # rows (in x order: 'order' itself, or 'targets' sorted by x) lo:hi
+    # form an x-slab; its sources are the halo of defects within the
+    # largest cutoff in x, read in place from the neighboring slabs, and
+    # pairs beyond the cutoff are dropped. 'pairs' gets the number of
+    # sources each row evaluated.
+    precision = tuple(POLICIES)[int(params[0])]
+    n, targeted = int(params[1]), bool(params[2])
+    pos, E, R = arrays['positions'][:n], arrays['energies'][:n], arrays['ranges'][:n]
+    if 'order' not in arrays:
+        rows = arrays['targets'][lo:hi] if targeted else np.arange(lo, hi)
+        arrays['forces'][rows] = compute_forces(pos, E, R, targets=rows, precision=precision)
+        arrays['pairs'][rows] = n
+        return
+    order, cutoff = arrays['order'][:n], arrays['cutoff'][:n]
+    rows = arrays['targets'][lo:hi] if targeted else order[lo:hi]
+    x = pos[order, 0]  # Ascending
+    reach = cutoff.max()
+    a = np.searchsorted(x, pos[rows[0], 0] - reach, side='left')
+    b = np.searchsorted(x, pos[rows[-1], 0] + reach, side='right')
+    rank = np.empty(n, dtype=np.intp)
+    rank[order] = np.arange(n)
+    sources = order[a:b]
+    arrays['forces'][rows] = compute_forces(pos[sources], E[sources], R[sources], targets=rank[rows] - a,
+                                            precision=precision, cutoff=cutoff[sources])
+    arrays['pairs'][rows] = b - a
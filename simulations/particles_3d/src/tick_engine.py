@@ -1,5 +1,14 @@
+import os
+
 import numpy as np
-from simulation.physics import compute_force
+from simulation.physics import compute_force, compute_forces, compute_forces_pairs, forces_tile
+from simulations import checkpoint
+from simulations.integrators import Integrator
+from simulations.neighbors import VerletList, range_cutoff
+from simulations.parallel import ParallelExecutor
+from simulations.precision import POLICIES, get_precision
+from simulations.profiler import NULL_PROFILER
+from simulations.trajectory_store import TrajectoryReader, TrajectoryWriter
 
 def initialize_particles(n):
     positions = np.random.uniform(-2, 2, (n, 3))
@@ -8,7 +17,94 @@ def initialize_particles(n):
     ranges = np.random.uniform(0.5, 1.5, n)
     return positions, velocities, energies, ranges
 
-def tick(positions, velocities, energies, ranges, dt=0.01, chaos_amp=0.05):
+def force_executor(energies, ranges, n_workers=None, cutoff_tol=None):
+    # A simulations.parallel.ParallelExecutor for force_field(executor=...):
+    # energies and ranges go into shared memory once, positions every call.
+    # Rows are split across n_workers processes, all-pairs, or with
+    # cutoff_tol as x-slabs that each read a halo of sources within the
+    # largest range_cutoff. Close it when done.
+    n = len(energies)
+    fields = {'positions': ((3,), float), 'energies': ((), float), 'ranges': ((), float),
+              'forces': ((3,), float), 'targets': ((), np.intp), 'pairs': ((), np.int64)}
+    if cutoff_tol is not None:
+        fields.update({'cutoff': ((), float), 'order': ((), np.intp)})
+    executor = ParallelExecutor({'forces': forces_tile}, fields, n, n_workers)
+    executor.arrays['energies'][:n] = energies
+    executor.arrays['ranges'][:n] = ranges
+    if cutoff_tol is not None:
+        executor.arrays['cutoff'][:n] = range_cutoff(ranges, cutoff_tol)
+    return executor
+
+def force_field(energies, ranges, max_tile_bytes=64 * 2**20, neighbors=None, precision='double',
+                profiler=None, executor=None):
+    # accel(x, idx=None) for simulations.integrators, all-pairs or over a
+    # Verlet neighbor list; idx restricts the evaluation to those particles.
+    # Each call is a 'forces' phase of the profiler (simulations.profiler),
+    # counting the pairs evaluated and any neighbor-list rebuild.
+    # executor (from force_executor) evaluates the rows (all, or idx) in
+    # parallel worker processes instead, with the executor's cutoff.
+    prof = NULL_PROFILER if profiler is None else profiler
+    def accel(positions, idx=None):
+        share = 1.0 if idx is None else len(idx) / len(positions)
+        with prof.phase('forces'):
+            if executor is not None:
+                n = len(positions)
+                arrays = executor.arrays
+                arrays['positions'][:n] = positions
+                rows = np.arange(n) if idx is None else np.asarray(idx)
+                if 'order' in arrays:  # x-slabs
+                    arrays['order'][:n] = np.argsort(positions[:, 0], kind='stable')
+                    if idx is not None:  # Slabs of the targets, in x order
+                        rows = rows[np.argsort(positions[rows, 0], kind='stable')]
+                if idx is not None:
+                    arrays['targets'][:len(rows)] = rows
+                prec = tuple(POLICIES).index(get_precision(precision).name)
+                executor.run('forces', len(rows), (prec, n, float(idx is not None)))
+                prof.count('pairs', int(arrays['pairs'][rows].sum()))
+                forces = arrays['forces'][:n]
+                return forces.copy() if idx is None else forces[idx]
+            if neighbors is not None:
+                built = neighbors.rebuilds
+                i, j = neighbors.pairs(positions)
+                prof.count('neighbor_rebuilds', neighbors.rebuilds - built)
+                prof.count('pairs', int(len(i) * share))
+                return compute_forces_pairs(positions, energies, ranges, i, j, targets=idx,
+                                            precision=precision)
+            prof.count('pairs', int(len(positions)**2 * share))
+            return compute_forces(positions, energies, ranges, max_tile_bytes, targets=idx,
+                                  precision=precision)
+    return accel
+
+def tick(positions, velocities, energies, ranges, dt=0.01, chaos_amp=0.05, batched=True,
+         max_tile_bytes=64 * 2**20, neighbors=None, integrator=None, precision='double',
+         profiler=None, executor=None):
+    # integrator: a simulations.integrators.Integrator over force_field(...);
+    # by default the original Euler update is applied inline. profiler
+    # times 'forces' and 'integrate' (an integrator's whole 'step', with its
+    # force passes nested inside when its force_field has the profiler too)
+    # and closes one tick per call.
+    prof = NULL_PROFILER if profiler is None else profiler
+    if not batched:
+        with prof.phase('reference'):
+            out = tick_reference(positions, velocities, energies, ranges, dt, chaos_amp)
+    elif integrator is not None:
+        with prof.phase('step'):
+            chaos = np.random.uniform(-1, 1, (len(positions), 3)) * chaos_amp
+            out = integrator.step(positions, velocities, kick=chaos)
+    else:
+        forces = force_field(energies, ranges, max_tile_bytes, neighbors, precision, prof, executor)(positions)
+        with prof.phase('integrate'):
+            # one draw of shape (N, 3) consumes the global RNG in the same order as
+            # the per-particle draws in tick_reference
+            chaos = np.random.uniform(-1, 1, (len(positions), 3)) * chaos_amp
+            new_vel = velocities + dt * forces + chaos
+            new_pos = positions + dt * new_vel
+        out = new_pos, new_vel
+    prof.end_tick()
+    return out
+
+def tick_reference(positions, velocities, energies, ranges, dt=0.01, chaos_amp=0.05):
+    # Scalar per-particle path, kept for equivalence checks against tick()
     new_pos = positions.copy()
     new_vel = velocities.copy()
     for i in range(len(positions)):
@@ -18,10 +114,100 @@ def tick(positions, velocities, energies, ranges, dt=0.01, chaos_amp=0.05):
         new_pos[i] += dt * new_vel[i]
     return new_pos, new_vel
 
-def run_simulation(n_particles=100, n_ticks=500, dt=0.01, chaos_amp=0.05):
-    positions, velocities, energies, ranges = initialize_particles(n_particles)
-    trajectory = [positions.copy()]
-    for _ in range(n_ticks):
-        positions, velocities = tick(positions, velocities, energies, ranges, dt, chaos_amp)
-        trajectory.append(positions.copy())
+def simulation_state(t, positions, velocities, energies, ranges, neighbors=None):
+    # (arrays, meta) of run_simulation after t ticks for simulations.checkpoint:
+    # the particle arrays, the global RNG state (so a resumed run replays the
+    # same chaos draws) and the neighbor list, whose pairs shape the forces.
+    # The integrator's cached acceleration is recomputed exactly on resume.
+    arrays = {'positions': positions.copy(), 'velocities': velocities.copy(),
+              'energies': energies.copy(), 'ranges': ranges.copy()}
+    meta = {'t': t, 'rng': checkpoint.encode(np.random.get_state(legacy=False), arrays, 'rng')}
+    if neighbors is not None:
+        arrays.update({f'neighbors.{k}': v.copy() for k, v in neighbors.state_dict().items()})
+    return arrays, meta
+
+def run_simulation(n_particles=100, n_ticks=500, dt=0.01, chaos_amp=0.05,
+                   cutoff_tol=None, skin=0.1, trajectory_path=None, method='euler',
+                   precision='double', profiler=None, checkpoint_path=None,
+                   checkpoint_every=100, resume=False, workers=None):
+    # cutoff_tol drops pairs whose kernel is below it (e.g. 1e-12) and switches
+    # to a Verlet neighbor list; None keeps the exact all-pairs sum.
+    # trajectory_path streams frames to an on-disk store and returns a lazy
+    # TrajectoryReader instead of an in-memory list.
+    # method picks a simulations.integrators scheme; 'euler' is the original
+    # update, 'verlet' needs one force pass per tick and tolerates larger dt.
+    # precision 'mixed' computes the pairwise force terms in float32
+    # (simulations.precision); positions and velocities stay float64.
+    # profiler: a simulations.profiler.Profiler to record every tick.
+    # checkpoint_path saves the run every checkpoint_every ticks and at the
+    # end (on a background thread, see simulations.checkpoint); with
+    # resume=True an existing checkpoint there is picked up and the run
+    # continues bit-identically to n_ticks, given the same other arguments.
+    # workers > 1 evaluates the forces in that many processes over shared
+    # memory (force_executor; with cutoff_tol as x-slabs instead of the
+    # neighbor list), the pool kept for the whole run.
+    arrays = None
+    if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+        arrays, meta = checkpoint.load(checkpoint_path)
+        positions, velocities, energies, ranges = (arrays[k] for k in ('positions', 'velocities', 'energies', 'ranges'))
+        np.random.set_state(checkpoint.decode(meta['rng'], arrays))
+        start = meta['t']
+    else:
+        positions, velocities, energies, ranges = initialize_particles(n_particles)
+        start = 0
+    neighbors = executor = None
+    if workers is not None and workers > 1:
+        executor = force_executor(energies, ranges, workers, cutoff_tol)
+    elif cutoff_tol is not None:
+        neighbors = VerletList(range_cutoff(ranges, cutoff_tol), skin=skin)
+        if arrays is not None:
+            neighbors.load_state({k.split('.', 1)[1]: v for k, v in arrays.items() if k.startswith('neighbors.')})
+    integrator = None
+    if method != 'euler':
+        accel = force_field(energies, ranges, neighbors=neighbors, precision=precision, profiler=profiler,
+                            executor=executor)
+        integrator = Integrator(accel, dt, method, scale=float(1 / ranges.max()))
+    if trajectory_path is None:
+        trajectory = [positions.copy()] if arrays is None else checkpoint.unpack_frames(arrays)
+        record = lambda pos: trajectory.append(pos.copy())
+    elif arrays is None:
+        writer = TrajectoryWriter(trajectory_path, dims=3)
+        writer.append(positions)
+        record = writer.append
+    else:  # Frames recorded after the checkpoint are dropped and recorded again
+        writer = TrajectoryWriter(trajectory_path, dims=3, mode='a', keep_frames=meta['frames'])
+        record = writer.append
+    checkpointer = None
+    if checkpoint_path is not None:
+        checkpointer = checkpoint.Checkpointer(checkpoint_path, checkpoint_every)
+
+    def save_checkpoint(t):
+        arrays, meta = simulation_state(t, positions, velocities, energies, ranges, neighbors)
+        prepare = None
+        if trajectory_path is None:
+            frames = list(trajectory)  # Frames are never modified, packed on the writer thread
+            prepare = lambda: checkpoint.pack_frames(frames)
+        else:
+            writer.flush()
+            meta['frames'] = len(writer)
+        checkpointer.submit(arrays, meta, prepare)
+
+    try:
+        for t in range(start, n_ticks):
+            positions, velocities = tick(positions, velocities, energies, ranges, dt, chaos_amp,
+                                         neighbors=neighbors, integrator=integrator, precision=precision,
+                                         profiler=profiler, executor=executor)
+            record(positions)
+            if checkpointer is not None and checkpointer.due(t + 1):
+                save_checkpoint(t + 1)
+    finally:
+        if executor is not None:
+            executor.close()
+    if checkpointer is not None:
+        if not checkpointer.due(n_ticks):
+            save_checkpoint(max(start, n_ticks))
+        checkpointer.close()
+    if trajectory_path is not None:
+        writer.close()
+        trajectory = TrajectoryReader(trajectory_path)
     return trajectory, energies, ranges
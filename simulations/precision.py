@@ -0,0 +1,157 @@
+"""Precision policies for the pairwise interaction kernels.
+
+The O(N^2) part of every engine is a few (N, N) or (N, N, d) temporaries
+(diffs, squared distances, kernel weights) streamed through memory once
+per tick; the O(N) state is small. A policy sets the dtype of those
+pairwise arrays and of the sums taken over them:
+
+    'double'  everything float64 (the reference path, unchanged results)
+    'mixed'   pairwise arrays float32, so half the bytes move; sums over
+              partners are formed in float32 blocks of `block` columns
+              and added up in float64, so forces, Phi and I_avg don't
+              pick up N-long float32 rounding
+
+Per-defect state (positions, velocities, E, S) stays float64 in both, so
+tiny dt updates aren't rounded away. compare() and the __main__ harness
+report how far a 'mixed' run drifts from the float64 one:
+
+    python -m simulations.precision
+"""
+
+import time
+
+import numpy as np
+
+
+class Precision:
+    """Storage dtype for pairwise arrays plus the accumulation dtype."""
+
+    def __init__(self, name, storage, accumulate=np.float64, block=256):
+        self.name = name
+        self.storage = np.dtype(storage)
+        self.accumulate = np.dtype(accumulate)
+        self.block = block
+
+    def __repr__(self):
+        return f"Precision({self.name!r}, storage={self.storage}, accumulate={self.accumulate})"
+
+    @property
+    def blocked(self):
+        return self.storage != self.accumulate
+
+    def cast(self, x):
+        """x in the storage dtype (no copy if it already is)."""
+        return np.asarray(x, dtype=self.storage)
+
+    def sum_blocks(self, partial, n):
+        """Sum of partial(s) over consecutive slices s of range(n).
+
+        Each block's partial is computed in the storage dtype and the
+        running total kept in the accumulation dtype; with matching dtypes
+        it is one call over everything.
+        """
+        if not self.blocked:
+            return partial(slice(None))
+        total = None
+        for start in range(0, n, self.block):
+            part = partial(slice(start, start + self.block)).astype(self.accumulate)
+            total = part if total is None else total + part
+        if total is None:
+            total = np.asarray(partial(slice(0, 0)), dtype=self.accumulate)
+        return total
+
+    def weighted_diff_sum(self, w, diffs, axis=1):
+        """sum_j w_ij diffs_ijk for axis=1, or sum_i w_ij diffs_ijk for axis=0."""
+        if axis == 1:
+            return self.sum_blocks(lambda s: np.einsum('ij,ijk->ik', w[:, s], diffs[:, s]), w.shape[1])
+        return self.sum_blocks(lambda s: np.einsum('ij,ijk->jk', w[s], diffs[s]), w.shape[0])
+
+    def matvec(self, M, v):
+        """M @ v with the sum over columns accumulated blockwise."""
+        v = self.cast(v)
+        return self.sum_blocks(lambda s: M[:, s] @ v[s], M.shape[1])
+
+    def mean(self, x):
+        """Mean of an array, accumulated in the accumulation dtype."""
+        return np.mean(x, dtype=self.accumulate)
+
+
+POLICIES = {
+    'double': Precision('double', np.float64),
+    'mixed': Precision('mixed', np.float32),
+}
+
+
+def get_precision(precision):
+    """A Precision from a policy name (or a Precision, returned as is)."""
+    if isinstance(precision, Precision):
+        return precision
+    if precision not in POLICIES:
+        raise ValueError(f"Unknown precision {precision!r}; choose from {tuple(POLICIES)}")
+    return POLICIES[precision]
+
+
+# ── Validation ────────────────────────────────────────────────────────
+def compare(reference, test, dt=1.0):
+    """Deviation of a test trajectory from a reference, frame by frame.
+
+    Both are sequences of (N_t, d) frames (lists, arrays or
+    TrajectoryReaders); frames are compared over the defects both have.
+    Returns per-frame 'max' and 'rms' deviation, 'first_mismatch' (first
+    frame whose N differs, or None) and 'growth', the fitted exponential
+    rate of the RMS deviation per unit time: a finite-time Lyapunov
+    estimate seeded by rounding.
+    """
+    n = min(len(reference), len(test))
+    dev_max, dev_rms, first_mismatch = np.zeros(n), np.zeros(n), None
+    for t in range(n):
+        a, b = np.asarray(reference[t]), np.asarray(test[t])
+        if len(a) != len(b) and first_mismatch is None:
+            first_mismatch = t
+        m = min(len(a), len(b))
+        d = np.linalg.norm(a[:m] - b[:m], axis=-1) if m else np.zeros(1)
+        dev_max[t], dev_rms[t] = d.max(), np.sqrt(np.mean(d**2))
+    grown = np.flatnonzero(dev_rms > 0)
+    growth = np.nan
+    if len(grown) > 2:
+        growth = np.polyfit(grown * dt, np.log(dev_rms[grown]), 1)[0]
+    return {'max': dev_max, 'rms': dev_rms, 'first_mismatch': first_mismatch, 'growth': growth}
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def _report(name, t_double, t_mixed, result):
+    print(f"{name}: double {t_double:.2f} s, mixed {t_mixed:.2f} s ({t_double / t_mixed:.2f}x); "
+          f"final max deviation {result['max'][-1]:.2e}, rms {result['rms'][-1]:.2e}, "
+          f"growth rate {result['growth']:.3f}"
+          + (f", N diverges at frame {result['first_mismatch']}" if result['first_mismatch'] is not None else ""))
+
+
+if __name__ == '__main__':
+    # Validation harness: each engine run under both policies from the same seed
+    import contextlib
+    import io
+
+    from simulations.lyapunov_ensemble import run_ensemble
+    from simulations.vdm_engine import VDMEngine
+
+    def engine_run(precision):
+        engine = VDMEngine(dims=2, N_initial=400, steps=50, max_N=400, precision=precision)
+        with contextlib.redirect_stdout(io.StringIO()):  # Engine prints per tick and summary
+            engine.run()
+        return engine.pos_history
+
+    ref, t64 = _timed(lambda: engine_run('double'))
+    test, t32 = _timed(lambda: engine_run('mixed'))
+    _report("VDMEngine (2D, N=400, 50 ticks)", t64, t32, compare(ref, test, dt=0.001))
+
+    lyap = {}
+    for p in ('double', 'mixed'):
+        lyap[p], elapsed = _timed(lambda: run_ensemble(n_replicas=20, N_def=5, n_steps=2000, precision=p))
+        print(f"Lyapunov ({p}): {lyap[p]['mean']:.4f} (95% CI {lyap[p]['ci'][0]:.4f} to "
+              f"{lyap[p]['ci'][1]:.4f}), {elapsed:.2f} s")
+    print(f"Lyapunov deviation mixed - double: {lyap['mixed']['mean'] - lyap['double']['mean']:+.2e}")
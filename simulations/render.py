@@ -0,0 +1,300 @@
+"""Parallel, streaming rendering of stored trajectories to video.
+
+A Scene builds its figure and artists once (setup) and only moves them for
+each frame (draw), reading what it shows from a trajectory store (see
+trajectory_store.py) rather than stepping a simulation inside
+FuncAnimation.update. render() splits the frames into ranges, draws them
+on a process pool (one Agg figure per worker) and pipes the raw RGB
+frames, in order, into an ffmpeg subprocess, or a Pillow one for .gif.
+Only a few ranges are in flight at a time, so memory stays flat however
+long the movie; throughput scales with the number of workers.
+
+    render(TrailsScene('runs/binding', frame_step=10), 'binding.mp4', fps=30)
+"""
+
+import math
+import multiprocessing
+import os
+import subprocess
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulations.trajectory_store import TrajectoryReader
+from simulations.void_field import field_grid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ── Scenes ────────────────────────────────────────────────────────────
+class Scene:
+    """One animation: figure size, number of frames and per-frame drawing.
+
+    Scenes are pickled to the workers, so keep only plain parameters and
+    paths on them before setup(); each worker then builds its own artists.
+    """
+    figsize = (6.4, 4.8)
+    dpi = 100
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def setup(self, fig):
+        """Create axes and artists on fig."""
+        raise NotImplementedError
+
+    def draw(self, k):
+        """Update the artists for frame k."""
+        raise NotImplementedError
+
+
+class TrailsScene(Scene):
+    """2D defect paths growing over time, one line per defect."""
+
+    def __init__(self, path, frame_step=1, dt=1.0, lim=3.0, figsize=(6, 6), dpi=100):
+        self.path = path
+        self.frame_step = frame_step
+        self.dt = dt
+        self.lim = lim
+        self.figsize = figsize
+        self.dpi = dpi
+
+    def __len__(self):
+        return math.ceil(len(TrajectoryReader(self.path)) / self.frame_step)
+
+    def setup(self, fig):
+        self.track = TrajectoryReader(self.path).padded()
+        ax = fig.add_subplot()
+        ax.set_xlim(-self.lim, self.lim)
+        ax.set_ylim(-self.lim, self.lim)
+        self.lines = [ax.plot([], [], label=f'Defect {i+1}')[0] for i in range(self.track.shape[1])]
+        ax.legend()
+        self.title = ax.set_title('')
+
+    def draw(self, k):
+        step = k * self.frame_step
+        for i, line in enumerate(self.lines):
+            line.set_data(self.track[:step, i, 0], self.track[:step, i, 1])
+        self.title.set_text(f'Tick: {step * self.dt:.2f}')
+
+
+class FieldScene(Scene):
+    """Top-down image of the void field with the defects on top.
+
+    The field is synthesized per emitted frame at grid_size x grid_size.
+    """
+
+    def __init__(self, path, energies, scales, extent=5.0, grid_size=100, title='Void Field + Defects',
+                 figsize=(6.4, 4.8), dpi=150):
+        self.path = path
+        self.energies = np.asarray(energies)
+        self.scales = np.asarray(scales)
+        self.extent = extent
+        self.grid_size = grid_size
+        self.title = title
+        self.figsize = figsize
+        self.dpi = dpi
+
+    def __len__(self):
+        return len(TrajectoryReader(self.path))
+
+    def _image(self, pos):
+        return field_grid(pos, self.energies, self.scales, (self.x, self.x)).T
+
+    def setup(self, fig):
+        self.reader = TrajectoryReader(self.path)
+        self.x = x = np.linspace(-self.extent, self.extent, self.grid_size)
+        phi0 = self._image(self.reader[0])
+        ax = fig.add_subplot()
+        self.im = ax.imshow(phi0, extent=[x[0], x[-1], x[0], x[-1]], origin='lower',
+                            cmap='viridis', vmin=0, vmax=phi0.max())
+        self.pts = ax.scatter(*self.reader[0].T, c='red', s=50)
+        ax.set_title(self.title)
+
+    def draw(self, k):
+        pos = self.reader[k]
+        self.im.set_data(self._image(pos))
+        self.pts.set_offsets(pos)
+
+
+class SurfaceScene(FieldScene):
+    """Rotating 3D surface of the field; one quad mesh whose vertices move.
+
+    Only every stride-th grid line (plus the last) is synthesized and drawn.
+    """
+
+    def __init__(self, path, energies, scales, extent=5.0, grid_size=100, stride=2,
+                 figsize=(8, 6), dpi=100):
+        super().__init__(path, energies, scales, extent, grid_size, None, figsize, dpi)
+        self.stride = stride
+
+    def _quads(self, pos):
+        # Corners of every cell of the strided grid, as (n_quads, 4, 3)
+        X, Y = np.meshgrid(self.x, self.x)
+        Z = self._image(pos)
+        corners = [(slice(None, -1), slice(None, -1)), (slice(None, -1), slice(1, None)),
+                   (slice(1, None), slice(1, None)), (slice(1, None), slice(None, -1))]
+        return np.stack([np.stack([X[c], Y[c], Z[c]], axis=-1).reshape(-1, 3) for c in corners], axis=1)
+
+    def setup(self, fig):
+        from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+        self.reader = TrajectoryReader(self.path)
+        x = np.linspace(-self.extent, self.extent, self.grid_size)
+        self.x = x[np.unique(np.r_[np.arange(0, self.grid_size, self.stride), self.grid_size - 1])]
+        self.ax = fig.add_subplot(projection='3d')
+        self.ax.set_xlim(-self.extent, self.extent)
+        self.ax.set_ylim(-self.extent, self.extent)
+        self.ax.set_zlim(0, self.energies.max())
+        quads = self._quads(self.reader[0])
+        self.surf = Poly3DCollection(quads, cmap='viridis', linewidth=0, antialiased=False)
+        self.surf.set_array(quads[..., 2].mean(axis=1))
+        self.surf.set_clim(0, self.energies.max())
+        self.ax.add_collection3d(self.surf)
+
+    def draw(self, k):
+        quads = self._quads(self.reader[k])
+        self.surf.set_verts(quads)
+        self.surf.set_array(quads[..., 2].mean(axis=1))
+        self.ax.view_init(elev=30, azim=k * 360 / len(self.reader))
+
+
+# ── Frame sinks ───────────────────────────────────────────────────────
+class FramePipe:
+    """Raw RGB frames written to a subprocess's stdin."""
+
+    def __init__(self, cmd, env=None):
+        self.cmd = cmd
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, env=env)
+
+    def write(self, data):
+        self.proc.stdin.write(data)
+
+    def close(self):
+        if self.proc.stdin.closed:
+            return
+        self.proc.stdin.close()
+        if self.proc.wait():
+            raise RuntimeError(f"{self.cmd[0]} exited with status {self.proc.returncode}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ffmpeg_command(path, width, height, fps, codec='libx264', crf=18):
+    # yuv420p needs even sides, so odd sizes get one padding pixel
+    return ['ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', codec, '-crf', str(crf),
+            '-pix_fmt', 'yuv420p', path]
+
+
+def open_sink(path, width, height, fps):
+    """ffmpeg pipe for videos, a Pillow subprocess for .gif."""
+    if path.lower().endswith('.gif'):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+        return FramePipe([sys.executable, '-m', 'simulations.render', 'gif', path,
+                          str(width), str(height), str(fps)], env=env)
+    return FramePipe(ffmpeg_command(path, width, height, fps))
+
+
+def _write_gif(path, width, height, fps, stream):
+    # Pillow keeps each (palettized) frame until the file is written, so
+    # GIFs suit short clips; long movies should go to ffmpeg
+    from PIL import Image
+
+    frame_bytes = width * height * 3
+
+    def frames():
+        while True:
+            data = stream.read(frame_bytes)
+            if len(data) < frame_bytes:
+                return
+            yield Image.frombytes('RGB', (width, height), data)
+
+    it = frames()
+    first = next(it)
+    first.save(path, save_all=True, append_images=it, duration=1000 / fps, loop=0)
+
+
+# ── Rendering ─────────────────────────────────────────────────────────
+def frame_size(scene):
+    """(width, height) in pixels, as the Agg canvas will size them."""
+    from matplotlib.figure import Figure
+
+    width, height = Figure(figsize=scene.figsize, dpi=scene.dpi).bbox.size
+    return int(width), int(height)
+
+
+def _build(scene):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=scene.figsize, dpi=scene.dpi)
+    FigureCanvasAgg(fig)
+    scene.setup(fig)
+    return scene, fig
+
+
+def _draw_range(built, start, stop):
+    scene, fig = built
+    out = []
+    for k in range(start, stop):
+        scene.draw(k)
+        fig.canvas.draw()
+        out.append(np.asarray(fig.canvas.buffer_rgba())[:, :, :3].tobytes())
+    return b''.join(out)
+
+
+_worker = None
+
+
+def _init_worker(scene):
+    global _worker
+    _worker = _build(scene)
+
+
+def _render_range(start, stop):
+    return _draw_range(_worker, start, stop)
+
+
+def render(scene, path, fps=30, workers=None, chunk=8):
+    """Render every frame of scene into path (.mp4 etc. via ffmpeg, .gif via Pillow).
+
+    workers=1 draws in this process; otherwise `chunk`-frame ranges go to a
+    pool of `workers` processes (default: all cores), with at most two
+    ranges per worker waiting to be written.
+    """
+    n = len(scene)
+    width, height = frame_size(scene)
+    ranges = [(s, min(s + chunk, n)) for s in range(0, n, chunk)]
+    with open_sink(path, width, height, fps) as sink:
+        if workers == 1:
+            built = _build(scene)
+            for start, stop in ranges:
+                sink.write(_draw_range(built, start, stop))
+            return
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(scene,)) as pool:
+            pending = deque()
+            for start, stop in ranges:
+                pending.append(pool.submit(_render_range, start, stop))
+                if len(pending) >= 2 * workers:
+                    sink.write(pending.popleft().result())
+            while pending:
+                sink.write(pending.popleft().result())
+
+
+if __name__ == '__main__':
+    # Pillow side of open_sink: render gif PATH WIDTH HEIGHT FPS < raw RGB frames
+    if sys.argv[1:2] != ['gif']:
+        sys.exit("usage: python -m simulations.render gif PATH WIDTH HEIGHT FPS")
+    _, _, out, w, h, rate = sys.argv
+    _write_gif(out, int(w), int(h), float(rate), sys.stdin.buffer)
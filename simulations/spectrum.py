@@ -0,0 +1,118 @@
+"""Bound-state spectra of 1D Gaussian wells.
+
+Solves -psi'' + V psi = E psi with V(x) = -V0 exp(-x^2 / (width sigma^2))
+on a uniform grid given as (x_min, x_max, n), psi = 0 just past both ends.
+The central-difference Hamiltonian is tridiagonal, so eigh_tridiagonal
+returns only the k lowest levels in O(n k) instead of a dense eigh of an
+n x n matrix. width=2 is the engine's kernel convention, exp(-x^2/(2 s^2));
+Bound_states.py and particle_aspects.py use width=1.
+
+levels() memoizes in-process (LRU) and, given a cache_dir, on disk under a
+hash of (V0, sigma, grid, k, width) and this module's source, using the
+sweep cache. spectrum_grid() solves a whole (V0, sigma) grid at once, the
+points missing from the cache going through sweep.run_sweep's process pool.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+from scipy.linalg import eigh_tridiagonal
+
+from simulations.sweep import cache_key, code_version, load_cached, run_sweep, store_cached
+
+MEMO_SIZE = 4096
+_memo = OrderedDict()
+
+
+def _params(V0, sigma, grid, k, width):
+    # Plain Python types, so memo and disk keys match however they were passed
+    x_min, x_max, n = grid
+    return {'V0': float(V0), 'sigma': float(sigma),
+            'grid': (float(x_min), float(x_max), int(n)), 'k': int(k), 'width': float(width)}
+
+
+def hamiltonian(V0, sigma, grid, width=2.0):
+    """Grid x, diagonal and off-diagonal of H for grid = (x_min, x_max, n)."""
+    x_min, x_max, n = grid
+    x = np.linspace(x_min, x_max, int(n))
+    dx = x[1] - x[0]
+    V = -V0 * np.exp(-x**2 / (width * sigma**2))
+    return x, 2 / dx**2 + V, np.full(int(n) - 1, -1 / dx**2)
+
+
+def solve_levels(V0, sigma, grid, k, width=2.0):
+    """The k lowest eigenvalues, uncached."""
+    _, d, e = hamiltonian(V0, sigma, grid, width)
+    return eigh_tridiagonal(d, e, eigvals_only=True, select='i', select_range=(0, k - 1))
+
+
+def solve_states(V0, sigma, grid, k, width=2.0):
+    """Grid x, the k lowest eigenvalues and their eigenvectors (columns), uncached."""
+    x, d, e = hamiltonian(V0, sigma, grid, width)
+    evals, evecs = eigh_tridiagonal(d, e, select='i', select_range=(0, k - 1))
+    return x, evals, evecs
+
+
+def _remember(key, result):
+    result.setflags(write=False)  # Shared between callers
+    _memo[key] = result
+    _memo.move_to_end(key)
+    if len(_memo) > MEMO_SIZE:
+        _memo.popitem(last=False)
+    return result
+
+
+def _disk_key(params):
+    return cache_key(solve_levels, params, code_version(solve_levels))
+
+
+def levels(V0, sigma, grid, k, width=2.0, cache_dir=None):
+    """Cached solve_levels; the returned array is read-only."""
+    params = _params(V0, sigma, grid, k, width)
+    key = tuple(params.values())
+    if key in _memo:
+        _memo.move_to_end(key)
+        return _memo[key]
+    entry = load_cached(cache_dir, _disk_key(params)) if cache_dir else None
+    if entry is None:
+        result = solve_levels(**params)
+        if cache_dir:
+            store_cached(cache_dir, _disk_key(params), {'params': params, 'result': result,
+                                                        'code': code_version(solve_levels)})
+    else:
+        result = entry['result']
+    return _remember(key, result)
+
+
+def bound_levels(V0, sigma, grid, k, width=2.0, cache_dir=None):
+    """The negative (bound) levels among the k lowest."""
+    evals = levels(V0, sigma, grid, k, width, cache_dir)
+    return evals[evals < 0]
+
+
+def spectrum_grid(V0s, sigmas, grid, k, width=2.0, cache_dir='spectrum_cache', max_workers=None):
+    """Levels for every (V0, sigma) pair, as an (len(V0s), len(sigmas), k) array.
+
+    Points not memoized yet are solved on a process pool through run_sweep
+    (which also reads and fills the disk cache); max_workers=1 solves them
+    in this process instead.
+    """
+    V0s, sigmas = np.atleast_1d(V0s), np.atleast_1d(sigmas)
+    out = np.empty((len(V0s), len(sigmas), k))
+    todo = []
+    for a, V0 in enumerate(V0s):
+        for b, sigma in enumerate(sigmas):
+            params = _params(V0, sigma, grid, k, width)
+            key = tuple(params.values())
+            if key in _memo:
+                out[a, b] = _memo[key]
+            elif max_workers == 1:
+                out[a, b] = levels(V0, sigma, grid, k, width, cache_dir)
+            else:
+                todo.append((a, b, params))
+    if todo:
+        results = run_sweep(solve_levels, [p for _, _, p in todo], cache_dir=cache_dir,
+                            max_workers=max_workers, version=code_version(solve_levels))
+        for (a, b, params), result in zip(todo, results):
+            out[a, b] = _remember(tuple(params.values()), np.asarray(result))
+    return out
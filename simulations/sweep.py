@@ -0,0 +1,229 @@
+"""Parameter sweeps over the simulation scripts.
+
+Each sweepable script exposes a module-level run(**params) (see
+VDMDecaySim.run, simulations.chaos_lyapunov2.run,
+simulations.Defect_binding.run). A sweep builds a list of parameter dicts
+(grid, random or Latin hypercube), runs every point not already cached on a
+process pool, and stores each result under a hash of the run function, its
+parameters and the source of its module and of every repo module that one
+imports (directly or not), so editing the simulation, or any helper it
+uses, invalidates old results and nothing else does.
+
+    from simulations import chaos_lyapunov2
+    from simulations.sweep import grid_points, run_sweep
+    points = grid_points(noise_std=[0.1, 0.3, 0.5], N_def=[3, 5])
+    results = run_sweep(chaos_lyapunov2.run, points, fixed={'n_steps': 2000})
+"""
+
+import ast
+import functools
+import hashlib
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+BLAS_THREAD_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                    'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+
+# ── Parameter specs ───────────────────────────────────────────────────
+def grid_points(**axes):
+    """Cartesian product of the given value lists, as a list of dicts."""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def random_points(n, seed=0, **bounds):
+    """n points drawn uniformly inside bounds given as name=(low, high)."""
+    rng = np.random.default_rng(seed)
+    cols = {name: rng.uniform(lo, hi, n) for name, (lo, hi) in bounds.items()}
+    return [{name: float(cols[name][k]) for name in bounds} for k in range(n)]
+
+
+def latin_hypercube_points(n, seed=0, **bounds):
+    """n points with exactly one sample in each of n equal strata per axis."""
+    rng = np.random.default_rng(seed)
+    cols = {}
+    for name, (lo, hi) in bounds.items():
+        u = (rng.permutation(n) + rng.random(n)) / n
+        cols[name] = lo + u * (hi - lo)
+    return [{name: float(cols[name][k]) for name in bounds} for k in range(n)]
+
+
+# ── Cache ─────────────────────────────────────────────────────────────
+def _source_root(module):
+    # The sys.path entry a module was imported from (its file, up one
+    # directory per dot in its name)
+    root = os.path.dirname(os.path.abspath(module.__file__))
+    for _ in range(module.__name__.count('.')):
+        root = os.path.dirname(root)
+    return root
+
+
+def _is_main_guard(node):
+    test = node.test if isinstance(node, ast.If) else None
+    return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name)
+            and test.left.id == '__name__' and isinstance(test.comparators[0], ast.Constant)
+            and test.comparators[0].value == '__main__')
+
+
+def _imported_names(path):
+    # Every module an import statement in the file names, function-level
+    # (lazy) imports included but not the `if __name__ == '__main__':`
+    # harness; 'from a import b' yields a and a.b, as b may be a submodule
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    tree.body = [node for node in tree.body if not _is_main_guard(node)]
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            yield from (alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module
+            yield from (f"{node.module}.{alias.name}" for alias in node.names)
+
+
+@functools.lru_cache(maxsize=None)
+def _local_file(name, root):
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    origin = spec.origin if spec is not None else None
+    if origin is None or not origin.endswith('.py') or not origin.startswith(root + os.sep):
+        return None
+    return origin
+
+
+def dependencies(fn, depends=()):
+    """Source files behind fn: its module's, and every module reachable
+    from it by import statements that lives in the same source tree (the
+    simulations package and the repo's scripts, not installed packages),
+    plus the modules in depends (names or module objects). Sorted by name."""
+    module = sys.modules[fn.__module__]
+    root = _source_root(module)
+    files = {module.__name__: os.path.abspath(module.__file__)}
+    for dep in depends:
+        dep = sys.modules[dep] if isinstance(dep, str) else dep
+        files[dep.__name__] = os.path.abspath(dep.__file__)
+    stack = list(files.values())
+    while stack:
+        for name in _imported_names(stack.pop()):
+            path = _local_file(name, root)
+            if path is not None and name not in files:
+                files[name] = path
+                stack.append(path)
+    return dict(sorted(files.items()))
+
+
+def code_version(fn, depends=()):
+    """Hash of the source of fn's module and every module it depends on
+    (see dependencies), re-read on each call so edits show up at once."""
+    digest = hashlib.sha256()
+    for name, path in dependencies(fn, depends).items():
+        with open(path, 'rb') as f:
+            digest.update(name.encode() + b'\0' + f.read() + b'\0')
+    return digest.hexdigest()[:16]
+
+
+def cache_key(fn, params, version):
+    payload = json.dumps({'fn': f"{fn.__module__}.{fn.__qualname__}",
+                          'params': params, 'code': version},
+                         sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], key + '.pkl')
+
+
+def load_cached(cache_dir, key):
+    path = _cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def store_cached(cache_dir, key, entry):
+    # Write to a temp file and rename, so a killed sweep never leaves a torn entry
+    path = _cache_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(entry, f)
+    os.replace(tmp, path)
+
+
+# ── Execution ─────────────────────────────────────────────────────────
+def _pin_blas_threads(n_threads):
+    # Worker initializer. The env vars cover BLAS libraries loaded from here
+    # on; threadpoolctl, when installed, also caps ones already loaded. Only
+    # ever run in a worker: threadpool_limits is process-wide and permanent.
+    for var in BLAS_THREAD_VARS:
+        os.environ[var] = str(n_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(n_threads)
+
+
+def _run_point(fn, params):
+    return fn(**params)
+
+
+def run_sweep(fn, points, fixed=None, cache_dir='sweep_cache', max_workers=None,
+              blas_threads=1, version=None, depends=()):
+    """Run fn(**fixed, **point) for every point, skipping cached ones.
+
+    Results come back in the order of `points`. Workers are spawned fresh
+    with BLAS pinned to blas_threads each, so max_workers processes (default:
+    all cores) don't oversubscribe the machine. Pass version to override
+    the source-hash code version, depends for modules the import scan can't
+    see (see dependencies), and cache_dir=None to skip the disk cache.
+    """
+    fixed = fixed or {}
+    version = version or code_version(fn, depends)
+    calls = [{**fixed, **p} for p in points]
+    keys = [cache_key(fn, params, version) for params in calls]
+    results = [None] * len(calls)
+    todo = []
+    for k, key in enumerate(keys):
+        entry = load_cached(cache_dir, key) if cache_dir else None
+        if entry is None:
+            todo.append(k)
+        else:
+            results[k] = entry['result']
+    if not todo:
+        return results
+
+    # Set in the parent only while the pool spawns, so the workers' BLAS
+    # starts pinned; the caller's own thread pools are left alone
+    saved = {var: os.environ.get(var) for var in BLAS_THREAD_VARS}
+    os.environ.update({var: str(blas_threads) for var in BLAS_THREAD_VARS})
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_pin_blas_threads,
+                                 initargs=(blas_threads,)) as pool:
+            futures = {pool.submit(_run_point, fn, calls[k]): k for k in todo}
+            for future in as_completed(futures):
+                k = futures[future]
+                results[k] = future.result()
+                if cache_dir:
+                    store_cached(cache_dir, keys[k], {'params': calls[k], 'code': version,
+                                                      'result': results[k]})
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+    return results
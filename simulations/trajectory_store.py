@@ -0,0 +1,161 @@
+"""Append-only on-disk trajectory storage.
+
+A store is a directory holding
+    meta.json    dims and dtype
+    frames.bin   every frame's (N_t, dims) rows back to back, raw
+    offsets.bin  int64 end row of each frame (cumulative), one per frame
+
+Frames may have different N (spawns), the offsets index records where each
+one ends. The writer buffers a few frames and appends them with plain file
+writes, so memory stays at one chunk no matter how long the run. Data is
+written before its offsets entry, so a crash leaves at most an ignored tail.
+The reader memory-maps both files and hands out frames lazily.
+"""
+
+import json
+import os
+
+import numpy as np
+
+META = 'meta.json'
+FRAMES = 'frames.bin'
+OFFSETS = 'offsets.bin'
+
+
+class TrajectoryWriter:
+    """Stream frames to a store directory.
+
+    mode='w' starts a fresh store, mode='a' continues an existing one (any
+    rows past the last complete frame are dropped first; with keep_frames,
+    everything after the first keep_frames frames, as when resuming from a
+    checkpoint taken at that point).
+    """
+
+    def __init__(self, path, dims, dtype=np.float64, chunk_frames=64, mode='w', keep_frames=None):
+        self.path = path
+        self.dims = dims
+        self.dtype = np.dtype(dtype)
+        self.chunk_frames = chunk_frames
+        self._frames = []
+        os.makedirs(path, exist_ok=True)
+        if mode == 'a' and os.path.exists(os.path.join(path, META)):
+            meta = _read_meta(path)
+            if meta['dims'] != dims or np.dtype(meta['dtype']) != self.dtype:
+                raise ValueError(f"Store at {path} holds dims={meta['dims']}, dtype={meta['dtype']}")
+            with open(os.path.join(path, OFFSETS), 'rb') as f:
+                raw = f.read()
+            # A crash mid-write can leave a partial entry: whole int64s only
+            ends = np.frombuffer(raw[:len(raw) - len(raw) % 8], dtype=np.int64)
+            if keep_frames is not None:
+                if keep_frames > len(ends):
+                    raise ValueError(f"Store at {path} has {len(ends)} frames, can't keep {keep_frames}")
+                ends = ends[:keep_frames]
+            with open(os.path.join(path, OFFSETS), 'r+b') as f:
+                f.truncate(ends.nbytes)
+            self._rows = int(ends[-1]) if len(ends) else 0
+            self._count = len(ends)
+            with open(os.path.join(path, FRAMES), 'r+b') as f:
+                f.truncate(self._rows * dims * self.dtype.itemsize)
+        else:
+            with open(os.path.join(path, META), 'w') as f:
+                json.dump({'dims': dims, 'dtype': self.dtype.str, 'version': 1}, f)
+            open(os.path.join(path, FRAMES), 'wb').close()
+            open(os.path.join(path, OFFSETS), 'wb').close()
+            self._rows = 0
+            self._count = 0
+        self._data_file = open(os.path.join(path, FRAMES), 'ab')
+        self._offsets_file = open(os.path.join(path, OFFSETS), 'ab')
+
+    def append(self, positions):
+        """Queue one (N_t, dims) frame; it is copied, so the caller may reuse the array."""
+        frame = np.asarray(positions, dtype=self.dtype).reshape(-1, self.dims)
+        self._frames.append(frame.copy())
+        self._count += 1
+        if len(self._frames) >= self.chunk_frames:
+            self.flush()
+
+    def __len__(self):
+        """Frames appended so far, flushed or not."""
+        return self._count
+
+    def flush(self):
+        if not self._frames:
+            return
+        ends = self._rows + np.cumsum([len(f) for f in self._frames], dtype=np.int64)
+        self._data_file.write(np.concatenate(self._frames).tobytes())
+        self._data_file.flush()
+        self._offsets_file.write(ends.tobytes())
+        self._offsets_file.flush()
+        self._rows = int(ends[-1])
+        self._frames = []
+
+    def close(self):
+        if self._data_file.closed:
+            return
+        self.flush()
+        self._data_file.close()
+        self._offsets_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """Lazy, random-access view of a store; frames are memmap slices."""
+
+    def __init__(self, path):
+        self.path = path
+        meta = _read_meta(path)
+        self.dims = meta['dims']
+        self.dtype = np.dtype(meta['dtype'])
+        self.ends = np.fromfile(os.path.join(path, OFFSETS), dtype=np.int64)
+        self.starts = np.concatenate([[0], self.ends[:-1]])
+        rows = int(self.ends[-1]) if len(self.ends) else 0
+        if rows:
+            self._data = np.memmap(os.path.join(path, FRAMES), dtype=self.dtype,
+                                   mode='r', shape=(rows, self.dims))
+        else:
+            self._data = np.empty((0, self.dims), dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, t):
+        if isinstance(t, slice):
+            return [self[k] for k in range(*t.indices(len(self)))]
+        if t < 0:
+            t += len(self)
+        if not 0 <= t < len(self):
+            raise IndexError(f"Frame {t} out of range for {len(self)} frames")
+        return self._data[self.starts[t]:self.ends[t]]
+
+    def __iter__(self):
+        for t in range(len(self)):
+            yield self[t]
+
+    def sizes(self):
+        """Number of defects in every frame."""
+        return self.ends - self.starts
+
+    def padded(self, max_defects=None, start=0, stop=None):
+        """(T, M, dims) array, NaN where a defect doesn't exist yet.
+
+        Same layout as VDMEngine.pos_history_array; M defaults to the largest
+        frame, pass max_defects to keep only the first few columns.
+        """
+        stop = len(self) if stop is None else stop
+        sizes = self.sizes()[start:stop]
+        M = int(sizes.max(initial=0)) if max_defects is None else max_defects
+        out = np.full((stop - start, M, self.dims), np.nan)
+        for k, t in enumerate(range(start, stop)):
+            frame = self[t][:M]
+            out[k, :len(frame)] = frame
+        return out
+
+
+def _read_meta(path):
+    with open(os.path.join(path, META)) as f:
+        return json.load(f)
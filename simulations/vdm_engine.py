@@ -0,0 +1,364 @@
+"""VDM engine: defects with energy and spin in a Gaussian curvature field.
+
+Moved here from vdmengine.ipynb / vdmenginesmanalog.ipynb so the notebooks,
+scripts and benchmarks share one copy. Run notebooks from the repo root so
+`simulations` is importable.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from simulations import checkpoint
+from simulations.backends import NumpyBackend, PairGeometry, get_backend
+from simulations.defect_store import DefectStore, interleave_pairs
+from simulations.precision import get_precision
+from simulations.profiler import NULL_PROFILER
+from simulations.spectrum import bound_levels
+from simulations.trajectory_store import TrajectoryReader, TrajectoryWriter
+
+
+def _store_field(name):
+    # Engine attribute backed by a zero-copy DefectStore view; assigning a new
+    # array writes it into the buffer, so `self.velocities = ...` still works
+    def get(self):
+        return self.store.view(name)
+
+    def set(self, value):
+        view = self.store.view(name)
+        if value is not view:
+            view[...] = value
+
+    return property(get, set)
+
+
+class VDMEngine:
+    positions = _store_field('positions')
+    velocities = _store_field('velocities')
+    E = _store_field('E')
+    S = _store_field('S')
+
+    def __init__(self, dims=3, N_initial=500, steps=100, dt=0.001, chaos_lambda=0.8, damping=0.8,
+                 threshold_I=0.5, max_N=1000, repulsion_on=True, rng_seed=42, trajectory_path=None,
+                 spectrum_cache=None, precision='double', backend='numpy', profiler=None,
+                 checkpoint_path=None, checkpoint_every=100):
+        # Constructor arguments, kept so resume() can rebuild the engine from a checkpoint
+        self.params = {'dims': dims, 'N_initial': N_initial, 'steps': steps, 'dt': dt,
+                       'chaos_lambda': chaos_lambda, 'damping': damping, 'threshold_I': threshold_I,
+                       'max_N': max_N, 'repulsion_on': repulsion_on, 'rng_seed': rng_seed,
+                       'trajectory_path': trajectory_path, 'spectrum_cache': spectrum_cache,
+                       'precision': get_precision(precision).name,
+                       'backend': backend if isinstance(backend, str) else backend.name,
+                       'checkpoint_path': checkpoint_path, 'checkpoint_every': checkpoint_every}
+        self.dims = dims
+        self.N_initial = N_initial
+        self.steps = steps
+        self.dt = dt
+        self.chaos_lambda = chaos_lambda
+        self.damping = damping
+        self.threshold_I = threshold_I
+        self.max_N = max_N
+        self.repulsion_on = repulsion_on
+        self.precision = get_precision(precision)  # 'mixed': float32 pairwise kernels, float64 sums
+        self.profiler = NULL_PROFILER if profiler is None else profiler  # See profiler.py
+        self.backend = get_backend(backend, self.precision, self.profiler)  # Pairwise pass; see backends.py
+        self.rng = np.random.default_rng(rng_seed)
+
+        # Initial state, held in growable buffers (spawns append in amortized O(1))
+        positions = self.rng.uniform(-1, 1, (N_initial, dims))
+        velocities = self.rng.uniform(-0.1, 0.1, (N_initial, dims))
+        E = np.ones(N_initial) * 5.0  # Base energy
+        spin_dims = 3 if dims == 3 else 1
+        S = self.rng.uniform(-0.5, 0.5, (N_initial, spin_dims))  # Spin: (N, spin_dims)
+        self.store = DefectStore(positions=positions, velocities=velocities, E=E, S=S)
+        self.t = 0  # Completed ticks
+
+        # History: in RAM by default, streamed to an on-disk store if trajectory_path is set
+        self.trajectory_path = trajectory_path
+        self.trajectory = TrajectoryWriter(trajectory_path, dims) if trajectory_path else None
+        self.pos_history = None if self.trajectory else []
+        self.record_positions()
+
+        # For bound states
+        self.V0 = 10.0  # Default for Gaussian well
+        self.sigma_bound = 2.0  # For bound solver
+        self.spectrum_cache = spectrum_cache  # Optional on-disk spectrum cache dir
+
+        # Periodic checkpoints, written off the tick loop (see checkpoint.py)
+        self.checkpointer = checkpoint.Checkpointer(checkpoint_path, checkpoint_every) if checkpoint_path else None
+
+    @property
+    def N(self):
+        return len(self.store)
+
+    def record_positions(self):
+        """Append the current positions to the history (list or on-disk store)."""
+        if self.trajectory is not None:
+            self.trajectory.append(self.positions)
+        else:
+            self.pos_history.append(self.positions.copy())
+
+    def compute_Phi_and_grad(self, positions, E, sigma, geom=None):
+        """Compute curvature field Phi and its gradient (plus repulsion).
+
+        Pass the tick's PairGeometry to reuse its distances. Returns
+        grad (N, d), kernel (N, N) and Phi (N,), computed on the NumPy
+        path whatever the engine's backend.
+        """
+        if geom is None:
+            geom = PairGeometry(positions, self.precision)
+        return NumpyBackend(self.precision).pair_terms(geom, E, sigma, self.repulsion_on)
+
+    def bound_state_spectra(self, V0=None, sigma=None):
+        """Solve 1D radial Schrodinger for bound states in Gaussian well.
+
+        Tridiagonal solve on [-20 sigma, 20 sigma] (512 points), memoized in
+        simulations.spectrum, so repeated engines don't re-solve.
+        """
+        if V0 is None: V0 = self.V0
+        if sigma is None: sigma = self.sigma_bound
+        L = 20 * sigma  # Box size
+        N_grid = 512
+        # Bound states (E < 0) among the 11 lowest levels
+        return bound_levels(V0, sigma, (-L, L, N_grid), k=11, cache_dir=self.spectrum_cache)
+
+    def spawn_energies(self, parents):
+        """Energy given to each defect of the pairs spawned by `parents`."""
+        return self.E[parents] / 2
+
+    def spawn(self, fields, force_mags, Phi):
+        """Batched pair production; returns the number of defects added.
+
+        Candidates are masked in one pass and every random quantity is drawn
+        in bulk, in a fixed order (acceptance, positions, velocities), so a
+        run is reproducible for a given rng_seed. Only the first pairs that
+        fit under max_N (in defect order) are drawn and added.
+        """
+        spawn_threshold = np.mean(Phi)
+        spawn_prob_base = self.chaos_lambda * np.std(force_mags) if np.std(force_mags) > 0 else 0.406
+        candidates = np.flatnonzero(force_mags > spawn_threshold)
+        u = self.rng.random(len(candidates))
+        parents = candidates[u < spawn_prob_base * (force_mags[candidates] / spawn_threshold)]
+        parents = parents[:max(0, -(-(self.max_N - self.N) // 2))]
+        k = len(parents)
+        if k == 0:
+            return 0
+
+        # Nearest neighbor of each parent (from the cached distances on the NumPy path)
+        closest = self.backend.nearest(fields, parents)
+        mid_points = (self.positions[parents] + self.positions[closest]) / 2
+        new_pos = mid_points[:, np.newaxis] + self.rng.normal(0, 0.1, (k, 2, self.dims))
+        new_vel = self.rng.uniform(-0.1, 0.1, (k, 2, self.dims))
+        new_E = self.spawn_energies(parents)
+        new_S = self.S[parents] / 2
+        self.store.append(positions=new_pos.reshape(2 * k, self.dims),
+                          velocities=new_vel.reshape(2 * k, self.dims),
+                          E=interleave_pairs(new_E, new_E), S=interleave_pairs(new_S, new_S))
+        return 2 * k
+
+    def tick(self):
+        """Single tick update (phases timed by self.profiler when enabled)."""
+        prof = self.profiler
+        # Emergent sigma, Phi and its gradient from one pairwise pass
+        fields = self.backend.fields(self.positions, self.E, self.repulsion_on)
+
+        # Spawn logic (pairs are added until N reaches max_N)
+        with prof.phase('spawn'):
+            force_mags = np.linalg.norm(fields['grad'], axis=1)
+            added = self.spawn(fields, force_mags, fields['Phi'])
+        prof.count('spawns', added)
+        if added:
+            # Post-spawn: the NumPy backend extends its cache by the new rows/columns only
+            fields = self.backend.fields(self.positions, self.E, self.repulsion_on, previous=fields)
+        fields = self.backend.finish(fields)
+        grad, Phi = fields['grad'], fields['Phi']
+
+        # Stall mask
+        with prof.phase('stall'):
+            Phi_crit = np.max(Phi) / 2 if np.max(Phi) > 0 else 15.0
+            stall_mask = Phi > Phi_crit
+            self.velocities[stall_mask] *= 0.1
+
+        # Spin update (torque=0 for central forces)
+        with prof.phase('spin'):
+            spin_dims = self.S.shape[1]
+            swirl = fields['swirl']  # sum_j (r_i - r_j) / (d_ij^2 + 1e-8)
+            if self.dims == 2:
+                S_scalar = self.S[:, 0].copy()
+                torque = np.zeros(self.N)
+                S_scalar += self.dt * torque / self.E
+                self.S[:, 0] = S_scalar
+                # Tangential grad for 2D: S_i * perp(sum_j ...), perp(x, y) = (-y, x)
+                tang_grad = S_scalar[:, np.newaxis] * np.stack([-swirl[:, 1], swirl[:, 0]], axis=1)
+                grad += tang_grad
+            else:  # 3D
+                torque = np.zeros((self.N, spin_dims))
+                self.S += self.dt * torque / self.E[:, np.newaxis]
+                # Tangential grad: S_i x sum_j ...
+                tang_grad = np.cross(self.S, swirl)
+                grad += tang_grad
+
+        # Update dynamics
+        with prof.phase('integrate'):
+            self.velocities = self.damping * self.velocities - self.dt * grad
+            self.velocities += self.chaos_lambda * self.rng.normal(0, 0.05, self.velocities.shape)
+            self.positions += self.dt * self.velocities
+            self.t += 1
+            self.record_positions()
+
+        # Energy evolution
+        with prof.phase('energy'):
+            alpha = 0.01 / (self.t + 1)  # Approx t+1
+            self.E += alpha * fields['n_close']  # Partners with kernel > 0.5
+
+        I_avg = fields['I_avg']  # Mean of exp(-d^2 / sigma^2), the kernel squared
+        if I_avg > self.threshold_I:
+            print(f"Cohesion at tick {self.t}")
+        prof.count('defects', self.N)
+        prof.end_tick(self.t)
+
+    # ── Checkpoint / restart ──────────────────────────────────────────
+    def state_dict(self):
+        """(arrays, meta, prepare) snapshot of the full engine state.
+
+        Arrays are copied now; prepare packs the in-RAM history later (its
+        frames are never modified once recorded, so only the list is copied).
+        An on-disk trajectory is flushed and its frame count recorded.
+        """
+        arrays = {name: self.store.view(name).copy() for name in self.store.fields}
+        meta = {'engine': type(self).__name__, 't': self.t, 'params': self.params}
+        meta['rng'] = checkpoint.encode(self.rng.bit_generator.state, arrays, 'rng')
+        if self.trajectory is not None:
+            self.trajectory.flush()
+            meta['frames'] = len(self.trajectory)
+            return arrays, meta, None
+        frames = list(self.pos_history)
+        return arrays, meta, lambda: checkpoint.pack_frames(frames)
+
+    def load_state(self, arrays, meta):
+        """Restore a state_dict() snapshot (after loading it from disk)."""
+        self.store = DefectStore(**{name: arrays[name] for name in ('positions', 'velocities', 'E', 'S')})
+        self.t = meta['t']
+        self.rng.bit_generator.state = checkpoint.decode(meta['rng'], arrays)
+        if self.trajectory_path:
+            if self.trajectory is not None:
+                self.trajectory.close()
+            self.trajectory = TrajectoryWriter(self.trajectory_path, self.dims, mode='a',
+                                               keep_frames=meta['frames'])
+            self.pos_history = None
+        else:
+            self.pos_history = checkpoint.unpack_frames(arrays)
+
+    def checkpoint(self, path=None):
+        """Write a checkpoint now: queued on the background writer, or
+        synchronously to path when one is given."""
+        arrays, meta, prepare = self.state_dict()
+        if path is not None:
+            checkpoint.save(path, {**arrays, **(prepare() if prepare else {})}, meta)
+        elif self.checkpointer is not None:
+            self.checkpointer.submit(arrays, meta, prepare)
+        else:
+            raise ValueError("No checkpoint path: pass one or construct with checkpoint_path")
+
+    @classmethod
+    def resume(cls, path, **overrides):
+        """Engine continuing bit-identically from the checkpoint at path.
+
+        overrides replace constructor arguments (e.g. steps=2000 to run
+        longer, profiler=...); the on-disk trajectory, if any, is cut back
+        to the checkpointed tick and appended to.
+        """
+        arrays, meta = checkpoint.load(path)
+        if meta['engine'] != cls.__name__:
+            raise ValueError(f"Checkpoint {path} holds a {meta['engine']}, not a {cls.__name__}")
+        params = {**meta['params'], **overrides}
+        trajectory_path = params.pop('trajectory_path')
+        engine = cls(**params)  # Fresh initial state, replaced below
+        engine.trajectory_path = engine.params['trajectory_path'] = trajectory_path
+        engine.load_state(arrays, meta)
+        return engine
+
+    def run(self):
+        """Run full simulation (from the current tick, so resumed engines finish the run)."""
+        while self.t < self.steps:
+            self.tick()
+            if self.checkpointer is not None and self.checkpointer.due(self.t):
+                self.checkpoint()
+        if self.checkpointer is not None:
+            if not self.checkpointer.due(self.t):  # Final state, unless just queued
+                self.checkpoint()
+            self.checkpointer.close()
+
+        # Pad history (on-disk runs stay on disk; plot_trajectories reads what it needs)
+        if self.trajectory is not None:
+            self.trajectory.close()
+        else:
+            max_N_h = self.pos_history[-1].shape[0]
+            self.pos_history_array = np.full((len(self.pos_history), max_N_h, self.dims), np.nan)
+            for ti, p in enumerate(self.pos_history):
+                self.pos_history_array[ti, :p.shape[0]] = p
+
+        # Stats
+        I_avg = self.backend.finish(self.backend.fields(self.positions, self.E, self.repulsion_on))['I_avg']
+        self.backend.close()  # Stops the 'parallel' backend's workers
+        print(f"Final N: {self.N}")
+        print(f"Final I_avg: {I_avg:.4f}")
+        print(f"Max E: {self.E.max():.2f}, Min E: {self.E.min():.2f}")
+        print(f"Mean E: {self.E.mean():.2f}")
+
+        # Bound spectra example
+        bound_evals = self.bound_state_spectra()
+        print(f"Bound state energies: {bound_evals}")
+
+    def plot_trajectories(self):
+        """Plot trajectories (2D only for now)."""
+        if self.dims != 2:
+            print("Plot for 2D only; use dims=2.")
+            return
+        if self.trajectory is not None:
+            history = TrajectoryReader(self.trajectory_path).padded(max_defects=20)
+        else:
+            history = self.pos_history_array
+        fig, ax = plt.subplots(figsize=(8,6))
+        for i in range(min(20, history.shape[1])):  # Limit for clarity
+            valid = ~np.isnan(history[:, i, 0])
+            ax.plot(history[valid, i, 0], history[valid, i, 1],
+                    label=f'Defect {i}' if i < 5 else "", alpha=0.7)
+        ax.set_title('Defect Trajectories with Pair Production')
+        ax.set_xlabel('Dimension 1')
+        ax.set_ylabel('Dimension 2')
+        ax.legend()
+        ax.grid(True)
+        plt.show()
+
+
+class VDMEngineSM(VDMEngine):  # Inherits base; add SM flavor
+    def __init__(self, *args, quantize_spawns=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.quantize_spawns = quantize_spawns
+        self.params['quantize_spawns'] = quantize_spawns
+        self.bound_evals = self.bound_state_spectra(V0=7.0, sigma=2.0)  # Tune for levels
+        self.bound_masses = np.abs(self.bound_evals)  # Positive for E/mass proxy
+        print(f"SM Bound levels (neg evals): {self.bound_evals}")
+        print(f"SM Mass proxies (abs): {self.bound_masses}")
+
+    def spawn_energies(self, parents):
+        """Quantized spawns: snap half the parent energy to the closest |E_n|."""
+        parent_E_half = self.E[parents] / 2
+        if not self.quantize_spawns:
+            return parent_E_half
+        dist_to_levels = np.abs(self.bound_masses[np.newaxis, :] - parent_E_half[:, np.newaxis])
+        closest_idx = np.argmin(dist_to_levels, axis=1)
+        counts = np.bincount(closest_idx, minlength=len(self.bound_masses))
+        print(f"Quantized {len(parents)} spawns -> pairs per level {counts.tolist()}")
+        return self.bound_masses[closest_idx]
+
+    def plot_E_histogram(self):
+        """Histogram final E; peaks at discrete masses."""
+        plt.figure(figsize=(8,5))
+        plt.hist(self.E, bins=20, alpha=0.7, edgecolor='black')
+        for idx, level in enumerate(self.bound_masses):
+            plt.axvline(level, color='red', linestyle='--', label=f'Gen {idx}')
+        plt.title('Emergent Mass Spectrum (E Histogram)')
+        plt.xlabel('Energy / Mass Proxy')
+        plt.ylabel('Count')
+        plt.legend()
+        plt.show()
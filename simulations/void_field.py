@@ -0,0 +1,60 @@
+"""The void field phi(r) = sum_j E_j exp(-2 R_j^2 |r - r_j|^2) and its forces.
+
+Dynamics only need grad phi at the defects, which is analytic:
+    grad phi(r_i) = -sum_j 4 E_j R_j^2 exp(-2 R_j^2 d_ij^2) (r_i - r_j)
+(a defect's own peak is flat at its center, so j = i drops out). That is
+O(N^2) over all pairs, or about O(N) with a cutoff_tol, where pairs beyond
+range_cutoff(R_j, tol) are skipped via simulations.neighbors.
+
+The field itself is only needed to draw it. field_grid() samples it on a
+tensor grid at any resolution from per-axis exponential tables, since the
+kernel factorizes as a product of 1D Gaussians.
+"""
+
+import numpy as np
+
+from simulations.neighbors import find_pairs, range_cutoff
+
+
+def field_gradient(positions, energies, scales, cutoff_tol=None, backend='auto'):
+    """grad phi at every defect, shape (N, d); the force is its negative."""
+    pos = np.asarray(positions, dtype=float)
+    E = np.asarray(energies, dtype=float)
+    R = np.asarray(scales, dtype=float)
+    coeff = -4 * E * R**2
+    alpha = 2 * R**2
+    if cutoff_tol is None:
+        diffs = pos[:, np.newaxis, :] - pos[np.newaxis, :, :]
+        d2 = np.einsum('ijk,ijk->ij', diffs, diffs)
+        w = coeff[np.newaxis, :] * np.exp(-alpha[np.newaxis, :] * d2)
+        return np.einsum('ij,ijk->ik', w, diffs)
+    i, j = find_pairs(pos, range_cutoff(R, cutoff_tol), backend)
+    d_vec = pos[i] - pos[j]
+    w = coeff[j] * np.exp(-alpha[j] * np.einsum('ij,ij->i', d_vec, d_vec))
+    grad = np.empty_like(pos)
+    for k in range(pos.shape[1]):
+        grad[:, k] = np.bincount(i, weights=w * d_vec[:, k], minlength=len(pos))
+    return grad
+
+
+def field_grid(positions, energies, scales, axes, chunk=256):
+    """phi on the grid spanned by `axes` (one 1D coordinate array per dimension).
+
+    Indexed like np.meshgrid(*axes, indexing='ij'), so a 2D image is
+    field_grid(...).T. Defects are summed in chunks to bound the einsum's
+    (chunk, G, G) intermediate.
+    """
+    pos = np.asarray(positions, dtype=float)
+    E = np.asarray(energies, dtype=float)
+    R = np.asarray(scales, dtype=float)
+    letters = 'ijkl'[:len(axes)]
+    subscripts = ','.join('p' + a for a in letters) + '->' + letters
+    phi = np.zeros(tuple(len(a) for a in axes))
+    for start in range(0, len(pos), chunk):
+        p = pos[start:start + chunk]
+        alpha = 2 * R[start:start + chunk, np.newaxis]**2
+        factors = [np.exp(-alpha * (np.asarray(a)[np.newaxis, :] - p[:, [k]])**2)
+                   for k, a in enumerate(axes)]
+        factors[0] = factors[0] * E[start:start + chunk, np.newaxis]
+        phi += np.einsum(subscripts, *factors, optimize=True)
+    return phi
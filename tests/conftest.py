@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The simulations package, and the particles_3d sources by bare module name
+# (clustering's spawned shard workers re-import it as such)
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'simulations', 'particles_3d', 'src')]
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from simulations import gauss_transform
+from simulations.backends import GaussTransformBackend, NumbaBackend, PairGeometry, ParallelBackend, get_backend
+
+KEYS = ('Phi', 'grad', 'swirl', 'I_avg')
+
+
+def cloud(n, dims, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dims)), rng.uniform(0.5, 2.0, n)
+
+
+def evaluate(backend, positions, E, repulsion):
+    try:
+        return backend.finish(backend.fields(positions, E, repulsion))
+    finally:
+        backend.close()
+
+
+def assert_fields_close(fields, reference, rtol):
+    assert fields['sigma'] == pytest.approx(reference['sigma'], rel=rtol)
+    for key in KEYS:
+        expected = np.asarray(reference[key])
+        scale = np.max(np.abs(expected))  # Relative to the largest entry: components may cancel to ~0
+        assert np.max(np.abs(np.asarray(fields[key]) - expected)) <= rtol * scale, key
+
+
+@pytest.mark.parametrize('dims', [2, 3])
+@pytest.mark.parametrize('repulsion', [True, False])
+@pytest.mark.parametrize('name', ['numba', 'parallel'])
+def test_fused_backends_match_numpy(name, dims, repulsion):
+    # Without Numba installed the 'numba' loops run as plain Python
+    positions, E = cloud(40, dims)
+    reference = evaluate(get_backend('numpy'), positions, E, repulsion)
+    backend = NumbaBackend() if name == 'numba' else ParallelBackend(n_workers=2)
+    fields = evaluate(backend, positions, E, repulsion)
+    assert_fields_close(fields, reference, 1e-12)
+    np.testing.assert_array_equal(fields['n_close'], reference['n_close'])
+
+
+@pytest.mark.parametrize('dims', [2, 3])
+@pytest.mark.parametrize('repulsion', [True, False])
+def test_fgt_backend_matches_numpy(monkeypatch, dims, repulsion):
+    positions, E = cloud(300, dims)
+    reference = evaluate(get_backend('numpy'), positions, E, repulsion)
+    # Below DIRECT_MAX pairs it is the 'numpy' path itself
+    assert_fields_close(evaluate(get_backend('fgt'), positions, E, repulsion), reference, 1e-15)
+
+    # Forced onto the approximate path: sigma, and with it every field, is sampled
+    monkeypatch.setattr(gauss_transform, 'DIRECT_MAX', 0)
+    fields = evaluate(GaussTransformBackend(samples=1 << 14), positions, E, repulsion)
+    assert fields['method'] in gauss_transform.METHODS
+    assert_fields_close(fields, reference, 2e-2)
+
+
+@pytest.mark.parametrize('dims', [1, 2, 3])
+@pytest.mark.parametrize('method', gauss_transform.METHODS)
+@pytest.mark.parametrize('sigma', [0.1, 1.0, 4.0])
+def test_gauss_transform_within_tolerance(method, dims, sigma):
+    positions, E = cloud(500, dims, seed=1)
+    exact = gauss_transform.gauss_transform(positions, E, sigma, method='direct')
+    out = gauss_transform.gauss_transform(positions, E, sigma, tol=1e-8, method=method)
+    assert out['method'] == method
+    assert np.max(np.abs(out['G'] - exact['G'])) <= 1e-8 * E.sum()
+    assert np.max(np.abs(out['grad'] - exact['grad'])) <= 1e-8 * E.sum() / sigma
+
+
+@pytest.mark.parametrize('dims, sigma, method', [(3, 0.5, 'direct'), (3, 1.0, 'direct'), (3, 3.0, 'fgt'),
+                                                 (2, 0.5, 'fgt'), (3, 0.1, 'cutoff')])
+def test_auto_picks_the_fastest_method(dims, sigma, method):
+    # Just above DIRECT_MAX. In 3D at sigma 0.5-1 the IFGT needs one cluster
+    # per few sources, each scanning every target: direct is 5x faster there
+    positions, _ = cloud(3000, dims)
+    assert gauss_transform.choose_method(positions, sigma) == method
+
+
+@pytest.mark.parametrize('precision', ['double', 'mixed'])
+def test_pair_geometry_extend_matches_rebuild(precision):
+    positions, _ = cloud(30, 3)
+    grown = np.concatenate([positions, cloud(4, 3, seed=1)[0]])
+    geom = PairGeometry(positions, precision)
+    geom.extend(grown)
+    fresh = PairGeometry(grown, precision)
+    np.testing.assert_array_equal(geom.diffs, fresh.diffs)
+    np.testing.assert_array_equal(geom.dists_sq, fresh.dists_sq)
+    assert geom.emergent_sigma() == pytest.approx(fresh.emergent_sigma(), rel=1e-6 if precision == 'mixed' else 1e-14)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from simulations.cellular_automaton import LIFE, CellularAutomaton, pack, parse_rule, unpack
+
+
+def loop_step(grid, birth=frozenset({3}), survive=frozenset({2, 3}), boundary='fixed'):
+    # The per-cell loop defect_propagation.py and recursive_geometry.py used
+    # (B3/S23, dead past the edges), with any rule and periodic borders added
+    H, W = grid.shape
+    new_grid = grid.copy()
+    for i in range(H):
+        for j in range(W):
+            if boundary == 'periodic':
+                rows, cols = np.arange(i - 1, i + 2) % H, np.arange(j - 1, j + 2) % W
+                # On grids under 3 wide a cell is reached by several offsets;
+                # like np.roll, each offset counts
+                window = [grid[r, c] for r in rows for c in cols]
+                neighbors = sum(window) - grid[i, j]
+            else:
+                neighbors = np.sum(grid[max(0, i-1):min(H, i+2), max(0, j-1):min(W, j+2)]) - grid[i, j]
+            new_grid[i, j] = neighbors in (survive if grid[i, j] else birth)
+    return new_grid
+
+
+def random_grid(shape, density=0.35, seed=0):
+    return np.random.default_rng(seed).random(shape) < density
+
+
+def test_dense_matches_the_original_loop():
+    grid = random_grid((30, 37))
+    ca = CellularAutomaton(grid, rule=LIFE)
+    expected = grid
+    for _ in range(15):
+        expected = loop_step(expected)
+        np.testing.assert_array_equal(ca.step().grid, expected)
+
+
+@pytest.mark.parametrize('shape', [(3, 5), (17, 64), (20, 100), (9, 130)])
+def test_pack_roundtrip(shape):
+    grid = random_grid(shape)
+    words = pack(grid)
+    assert words.shape == (shape[0], -(-shape[1] // 64))
+    np.testing.assert_array_equal(unpack(words, shape[1]), grid)
+
+
+@pytest.mark.parametrize('boundary', ['fixed', 'periodic'])
+@pytest.mark.parametrize('shape', [(12, 64), (17, 100), (9, 130), (16, 1)])
+@pytest.mark.parametrize('backend, tile', [('packed', 64), ('sparse', 5), ('sparse', 8), ('sparse', 64)])
+def test_backends_match_the_loop(backend, tile, shape, boundary):
+    # Widths off a multiple of 64 leave padding bits in the last word;
+    # tiles of 5 overhang the grid, and 64 is wider than it
+    grid = random_grid(shape, seed=shape[1])
+    ca = CellularAutomaton(grid, boundary=boundary, backend=backend, tile=tile)
+    expected = grid
+    for _ in range(12):
+        expected = loop_step(expected, boundary=boundary)
+        ca.step()
+        np.testing.assert_array_equal(ca.grid, expected)
+        assert ca.population == np.count_nonzero(expected)
+
+
+@pytest.mark.parametrize('boundary', ['fixed', 'periodic'])
+@pytest.mark.parametrize('rule', ['B36/S23', 'B2/S', 'B3678/S34678', 'B0/S8'])
+def test_backends_agree_on_other_rules(rule, boundary):
+    grid = random_grid((21, 70), density=0.2)
+    dense = CellularAutomaton(grid, rule=rule, boundary=boundary)
+    backends = [CellularAutomaton(grid, rule=rule, boundary=boundary, backend='packed')]
+    if 0 not in parse_rule(rule)[0]:
+        backends.append(CellularAutomaton(grid, rule=rule, boundary=boundary, backend='sparse', tile=6))
+    for _ in range(10):
+        dense.step()
+        for ca in backends:
+            np.testing.assert_array_equal(ca.step().grid, dense.grid)
+
+
+def test_glider_crosses_the_periodic_seam():
+    grid = np.zeros((10, 70), dtype=bool)
+    grid[[0, 1, 2, 2, 2], [67, 68, 66, 67, 68]] = True  # Heading down and right
+    for backend in ('dense', 'packed', 'sparse'):
+        ca = CellularAutomaton(grid, boundary='periodic', backend=backend, tile=4).step(4 * 10)
+        # Ten periods move it (10, 10): once round vertically, 10 cells across the seam
+        np.testing.assert_array_equal(ca.grid, np.roll(grid, 10, axis=1), backend)
+
+
+def test_sparse_rejects_birth_on_zero():
+    with pytest.raises(ValueError):
+        CellularAutomaton(np.zeros((8, 8)), rule='B03/S23', backend='sparse')
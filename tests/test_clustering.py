@@ -0,0 +1,25 @@
+import numpy as np
+from clustering import track_clusters
+from simulations.trajectory_store import TrajectoryWriter
+
+
+def test_sharded_tracking_matches_serial_across_empty_overlap(tmp_path):
+    # Frames 3 and 7 are noise only; with shard_frames=4 they are the
+    # overlap frames of the second and third shards
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / 'traj')
+    with TrajectoryWriter(path, 3) as writer:
+        for t in range(12):
+            if t in (3, 7):
+                frame = rng.uniform(-50, 50, (20, 3))
+            else:
+                frame = np.concatenate([rng.normal(0, 0.05, (10, 3)), rng.normal(5, 0.05, (10, 3))])
+            writer.append(frame)
+
+    serial = track_clusters(path)
+    sharded = track_clusters(path, workers=2, shard_frames=4)
+    assert sharded['events'] == serial['events']
+    assert [t for t, kind, _, _ in serial['events'] if kind == 'birth'] == [0, 0, 4, 4, 8, 8]
+    assert sharded['n_ids'] == serial['n_ids']
+    for key in ('n_clusters', 'n_noise', 'largest'):
+        np.testing.assert_array_equal(sharded[key], serial[key])
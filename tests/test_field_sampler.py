@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from simulations import particles_3d
+
+field_sampler = particles_3d.load('field_sampler')
+
+
+def particles(n, seed=0):
+    positions, energies, _ = particles_3d.random_particles(n, np.random.default_rng(seed))
+    ranges = np.random.default_rng(seed + 1).uniform(0.5, 2.0, n)
+    return positions, energies, ranges
+
+
+def test_exact_mode_matches_pointwise_sampling():
+    positions, energies, ranges = particles(20)
+    expected = field_sampler.sample_field(positions, energies, ranges, grid_size=6)
+    exact = field_sampler.sample_field_fast(positions, energies, ranges, grid_size=6, mode='exact')
+    for a, b in zip(exact, expected):
+        np.testing.assert_allclose(a, b, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('n, rtol', [(200, 0.1), (2000, 0.05)])
+def test_fft_mode_within_stated_tolerance(n, rtol):
+    # Relative to the field's maximum (see sample_field_fft)
+    positions, energies, ranges = particles(n)
+    exact = field_sampler.sample_field_fast(positions, energies, ranges, mode='exact')[0]
+    fft = field_sampler.sample_field_fast(positions, energies, ranges, mode='fft')[0]
+    assert np.max(np.abs(fft - exact)) <= rtol * np.max(np.abs(exact))
+
+
+def test_auto_mode_takes_fft_only_for_many_particles():
+    assert field_sampler.choose_mode(200, 50) == 'exact'
+    assert field_sampler.choose_mode(200, 100) == 'exact'
+    assert field_sampler.choose_mode(5000, 50) == 'fft'
+    positions, energies, ranges = particles(200)
+    auto = field_sampler.sample_field_fast(positions, energies, ranges, grid_size=20, mode='auto')[0]
+    exact = field_sampler.sample_field_fast(positions, energies, ranges, grid_size=20, mode='exact')[0]
+    np.testing.assert_array_equal(auto, exact)
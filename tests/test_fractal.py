@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+from simulations import fractal
+
+
+def brute_pyramid(points, weights, box, levels, origin, periodic):
+    # Per level, a dict from each occupied cell to its mass
+    u = (points - origin) / box
+    u = np.mod(u, 1.0) if periodic else np.clip(u, 0.0, 1.0)
+    counts, sum_sq = [], []
+    for k in levels:
+        boxes = defaultdict(float)
+        for point, w in zip(u, weights):
+            boxes[tuple(min(int(x * 2**k), 2**k - 1) for x in point)] += w
+        counts.append(len(boxes))
+        sum_sq.append(sum(m**2 for m in boxes.values()))
+    return counts, sum_sq
+
+
+def sierpinski(depth):
+    # The 3^depth points sum_j v_j / 2^j: the triangle's corners at that depth
+    corners = np.array([[0.0, 0.0], [1.0, 0.0], [0.5, np.sqrt(3) / 2]])
+    points = np.zeros((1, 2))
+    for _ in range(depth):
+        points = ((points[:, np.newaxis] + corners) / 2).reshape(-1, 2)
+    return points
+
+
+@pytest.mark.parametrize('dims', [1, 2, 3])
+@pytest.mark.parametrize('periodic', [True, False])
+def test_pyramid_matches_brute_force(dims, periodic):
+    rng = np.random.default_rng(dims)
+    # Three snapshots, some points outside the box (wrapped or clamped)
+    points = rng.uniform(-1.0, 5.0, (3, 150, dims))
+    weights = rng.uniform(0.5, 2.0, (3, 150))
+    pyr = fractal.box_pyramid(points, box=4.0, max_level=5, origin=-0.5, periodic=periodic, weights=weights)
+    assert pyr['counts'].shape == pyr['sum_sq'].shape == (3, 6)
+    for t in range(3):
+        counts, sum_sq = brute_pyramid(points[t], weights[t], 4.0, range(6), -0.5, periodic)
+        np.testing.assert_array_equal(pyr['counts'][t], counts)
+        np.testing.assert_allclose(pyr['sum_sq'][t], sum_sq, rtol=1e-12)
+        assert pyr['mass'][t] == pytest.approx(weights[t].sum())
+
+
+def test_snapshots_match_one_at_a_time():
+    points = np.random.default_rng(0).random((4, 2, 300, 2))
+    batched = fractal.box_pyramid(points, box=1.0, max_level=6)
+    for index in np.ndindex(4, 2):
+        single = fractal.box_pyramid(points[index], box=1.0, max_level=6)
+        np.testing.assert_array_equal(batched['counts'][index], single['counts'])
+        np.testing.assert_array_equal(batched['sum_sq'][index], single['sum_sq'])
+
+
+def test_uniform_cube_is_three_dimensional():
+    pyr = fractal.box_pyramid(np.random.default_rng(0).random((100000, 3)), box=1.0)
+    # Levels 0-4 (up to 4096 boxes for 1e5 points); finer ones are undersampled.
+    # sum p^2 ~ 1/boxes + 1/N, so D2 stops a level earlier
+    assert fractal.box_dimension(pyr, levels=range(5)) == pytest.approx(3.00, abs=0.005)
+    assert fractal.correlation_dimension(pyr, levels=range(4)) == pytest.approx(3.00, abs=0.01)
+    np.testing.assert_allclose(fractal.lacunarity(pyr)[:4], 1.0, atol=0.02)
+
+
+def test_sierpinski_dimension():
+    pyr = fractal.box_pyramid(sierpinski(10), box=1.0, max_level=9, periodic=False)
+    exact = np.log(3) / np.log(2)  # 1.585
+    assert fractal.box_dimension(pyr, levels=range(2, 9)) == pytest.approx(exact, abs=0.03)
+    assert fractal.correlation_dimension(pyr, levels=range(2, 9)) == pytest.approx(exact, abs=0.03)
+
+
+def test_fit_needs_two_levels():
+    pyr = fractal.box_pyramid(np.random.default_rng(0).random((50, 2)), box=1.0)
+    with pytest.raises(ValueError):
+        fractal.box_dimension(pyr, levels=[3])
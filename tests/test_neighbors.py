@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from simulations import particles_3d
+from simulations.neighbors import VerletList, find_pairs, range_cutoff
+
+physics = particles_3d.load('physics')
+
+
+def brute_pairs(positions, cutoff):
+    d = np.linalg.norm(positions[:, np.newaxis] - positions, axis=-1)
+    i, j = np.nonzero((d < np.broadcast_to(cutoff, len(positions))[np.newaxis, :]) & ~np.eye(len(positions), dtype=bool))
+    return set(zip(i.tolist(), j.tolist()))
+
+
+@pytest.mark.parametrize('backend', ['cell', 'kdtree'])
+@pytest.mark.parametrize('dims', [1, 2, 3])
+@pytest.mark.parametrize('per_source', [False, True])
+def test_pairs_match_brute_force(backend, dims, per_source):
+    rng = np.random.default_rng(dims)
+    positions = rng.uniform(-3, 3, (200, dims))
+    cutoff = rng.uniform(0.3, 1.0, 200) if per_source else 0.6
+    i, j = find_pairs(positions, cutoff, backend)
+    assert len(i) == len(set(zip(i.tolist(), j.tolist())))  # No duplicates
+    assert set(zip(i.tolist(), j.tolist())) == brute_pairs(positions, cutoff)
+
+
+def test_verlet_list_forces_match_cutoff_forces():
+    positions, energies, ranges = particles_3d.random_particles(200, np.random.default_rng(0))
+    positions *= 3
+    cutoff = range_cutoff(ranges, 1e-12)
+    neighbors = VerletList(cutoff, skin=0.2)
+    rng = np.random.default_rng(1)
+    for _ in range(5):  # Moves under skin / 2 reuse the list
+        i, j = neighbors.pairs(positions)
+        forces = physics.compute_forces_pairs(positions, energies, ranges, i, j)
+        # Every dropped pair has kernel < 1e-12 (the list keeps some of them, within the skin)
+        exact = physics.compute_forces(positions, energies, ranges)
+        np.testing.assert_allclose(forces, exact, rtol=0, atol=1e-9)
+        positions = positions + rng.uniform(-0.02, 0.02, positions.shape)
+    assert neighbors.rebuilds == 1
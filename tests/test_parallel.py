@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from simulations import particles_3d
+from simulations.profiler import Profiler
+
+tick_engine = particles_3d.load('tick_engine')
+physics = particles_3d.load('physics')
+
+
+@pytest.mark.parametrize('cutoff_tol', [None, 1e-12])
+def test_executor_forces_match_in_process(cutoff_tol):
+    positions, energies, ranges = particles_3d.random_particles(300, np.random.default_rng(0))
+    positions *= 5  # Wider than the cutoff, so slabs see part of the sources
+    cutoff = None if cutoff_tol is None else tick_engine.range_cutoff(ranges, cutoff_tol)
+    idx = np.flatnonzero(np.arange(300) % 7 == 0)
+    executor = tick_engine.force_executor(energies, ranges, n_workers=2, cutoff_tol=cutoff_tol)
+    try:
+        for targets in (None, idx):
+            prof = Profiler()
+            accel = tick_engine.force_field(energies, ranges, profiler=prof, executor=executor)
+            forces = accel(positions, targets)
+            expected = physics.compute_forces(positions, energies, ranges, targets=targets, cutoff=cutoff)
+            np.testing.assert_allclose(forces, expected, rtol=1e-12, atol=1e-12)
+            prof.end_tick()
+            pairs = prof.records[-1]['counters']['pairs']
+            rows = 300 if targets is None else len(idx)
+            if cutoff_tol is None:
+                assert pairs == rows * 300
+            else:  # Each row's slab halo only
+                assert rows <= pairs < rows * 300
+    finally:
+        executor.close()
@@ -0,0 +1,25 @@
+import numpy as np
+from simulations import particles_3d
+
+tick_engine = particles_3d.load('tick_engine')
+physics = particles_3d.load('physics')
+
+
+def test_batched_forces_match_per_particle():
+    positions, energies, ranges = particles_3d.random_particles(50, np.random.default_rng(0))
+    expected = np.array([physics.compute_force(i, positions, energies, ranges) for i in range(50)])
+    np.testing.assert_allclose(physics.compute_forces(positions, energies, ranges), expected, rtol=1e-12, atol=1e-12)
+    # Row tiles of a single row each
+    tiled = physics.compute_forces(positions, energies, ranges, max_tile_bytes=1)
+    np.testing.assert_allclose(tiled, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_batched_tick_matches_reference():
+    positions, energies, ranges = particles_3d.random_particles(50, np.random.default_rng(1))
+    velocities = np.random.default_rng(2).uniform(-0.2, 0.2, (50, 3))
+    np.random.seed(3)
+    batched = tick_engine.tick(positions, velocities, energies, ranges)
+    np.random.seed(3)
+    reference = tick_engine.tick_reference(positions, velocities, energies, ranges)
+    for a, b in zip(batched, reference):
+        np.testing.assert_allclose(a, b, rtol=1e-12, atol=1e-12)
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+import scipy.linalg
+from simulations import spectrum
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo(monkeypatch):
+    monkeypatch.setattr(spectrum, '_memo', OrderedDict())
+
+
+def dense_levels(V0, sigma, grid, k, width):
+    # -psi'' + V psi on the grid, psi = 0 past both ends, as a dense matrix
+    x_min, x_max, n = grid
+    x = np.linspace(x_min, x_max, n)
+    dx = x[1] - x[0]
+    D2 = (np.diag(np.full(n - 1, 1.0), -1) - 2 * np.eye(n) + np.diag(np.full(n - 1, 1.0), 1)) / dx**2
+    H = -D2 + np.diag(-V0 * np.exp(-x**2 / (width * sigma**2)))
+    return scipy.linalg.eigh(H, eigvals_only=True)[:k]
+
+
+def no_solves(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('solved again instead of hitting the cache')
+    monkeypatch.setattr(spectrum, 'eigh_tridiagonal', fail)
+
+
+@pytest.mark.parametrize('V0, sigma, grid, width', [(10.0, 2.0, (-20, 20, 400), 1.0), (3.0, 0.7, (-8, 8, 301), 2.0),
+                                                    (50.0, 1.0, (-5, 5, 200), 2.0)])
+def test_levels_match_dense_eigh(V0, sigma, grid, width):
+    np.testing.assert_allclose(spectrum.levels(V0, sigma, grid, 6, width), dense_levels(V0, sigma, grid, 6, width),
+                               rtol=0, atol=1e-9 * V0)
+
+
+def test_states_are_eigenvectors():
+    grid = (-10, 10, 300)
+    x, evals, evecs = spectrum.solve_states(5.0, 1.5, grid, 4)
+    _, d, e = spectrum.hamiltonian(5.0, 1.5, grid)
+    H = np.diag(d) + np.diag(e, 1) + np.diag(e, -1)
+    np.testing.assert_allclose(H @ evecs, evecs * evals, atol=1e-8)
+    assert x.shape == (300,) and evecs.shape == (300, 4)
+
+
+def test_solve_bound_levels_are_bound_states():
+    # particle_aspects.solve_bound's call. It used to shift-invert +d2/dr2 + V,
+    # which gave interior levels of the wrong-sign operator below -V0
+    V0, sigma, N, r_max = 10.0, 2.0, 1000, 10
+    dr = r_max / N
+    grid = (dr / 2, r_max - dr / 2, N)
+    r, evals, evecs = spectrum.solve_states(V0, sigma, grid, k=5, width=1.0)
+    np.testing.assert_allclose(evals, dense_levels(V0, sigma, grid, 5, 1.0), rtol=0, atol=1e-9)
+    assert np.all(np.diff(evals) > 0) and evals[0] > -V0
+    assert np.count_nonzero(evals < 0) >= 1
+
+
+def test_memo_and_disk_cache_return_the_same_levels(tmp_path, monkeypatch):
+    args = (8.0, 1.2, (-10, 10, 250), 5)
+    first = spectrum.levels(*args, cache_dir=tmp_path)
+    assert not first.flags.writeable
+    assert list(tmp_path.rglob('*.pkl')), 'nothing written to the disk cache'
+
+    no_solves(monkeypatch)
+    assert spectrum.levels(*args, cache_dir=tmp_path) is first  # Memo
+    monkeypatch.setattr(spectrum, '_memo', OrderedDict())
+    from_disk = spectrum.levels(*args, cache_dir=tmp_path)
+    np.testing.assert_array_equal(from_disk, first)
+    # Keys are normalized: ints, numpy scalars and lists hit the same entry
+    assert spectrum.levels(np.float32(8.0), 1.2, [-10.0, 10.0, np.int64(250)], 5, cache_dir=tmp_path) is from_disk
+
+
+def test_bound_levels_are_the_negative_levels():
+    evals = spectrum.levels(10.0, 2.0, (-20, 20, 400), 8, width=1.0)
+    np.testing.assert_array_equal(spectrum.bound_levels(10.0, 2.0, (-20, 20, 400), 8, width=1.0), evals[evals < 0])
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_spectrum_grid_matches_levels(tmp_path, monkeypatch, max_workers):
+    V0s, sigmas, grid, k = [2.0, 6.0, 12.0], [0.5, 1.5], (-8, 8, 160), 4
+    spectrum.levels(6.0, 1.5, grid, k)  # One point already memoized
+    out = spectrum.spectrum_grid(V0s, sigmas, grid, k, cache_dir=tmp_path, max_workers=max_workers)
+    assert out.shape == (3, 2, 4)
+
+    points = [(a, b, V0, sigma) for a, V0 in enumerate(V0s) for b, sigma in enumerate(sigmas)]
+    for a, b, V0, sigma in points:
+        np.testing.assert_array_equal(out[a, b], spectrum.solve_levels(V0, sigma, grid, k))
+
+    no_solves(monkeypatch)
+    for a, b, V0, sigma in points:  # Every point is now memoized
+        np.testing.assert_array_equal(spectrum.levels(V0, sigma, grid, k), out[a, b])
+    # and on disk under the keys levels() reads, except the one memoized beforehand
+    monkeypatch.setattr(spectrum, '_memo', OrderedDict())
+    for a, b, V0, sigma in points:
+        if (V0, sigma) != (6.0, 1.5):
+            np.testing.assert_array_equal(spectrum.levels(V0, sigma, grid, k, cache_dir=tmp_path), out[a, b])
@@ -0,0 +1,47 @@
+import os
+import sys
+import types
+
+from simulations import sweep
+
+
+def test_editing_a_dependency_misses_the_cache(tmp_path, monkeypatch):
+    # run() lives in one module, the value it returns in another it imports lazily
+    (tmp_path / 'sweepdemo_main.py').write_text('def run(x):\n    from sweepdemo_dep import value\n    return value + x\n')
+    (tmp_path / 'sweepdemo_dep.py').write_text('value = 1\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import sweepdemo_main
+
+    cache = str(tmp_path / 'cache')
+    assert list(sweep.dependencies(sweepdemo_main.run)) == ['sweepdemo_dep', 'sweepdemo_main']
+    before = sweep.code_version(sweepdemo_main.run)
+    assert sweep.run_sweep(sweepdemo_main.run, [{'x': 1}], cache_dir=cache, max_workers=1) == [2]
+
+    (tmp_path / 'sweepdemo_dep.py').write_text('value = 100\n')
+    assert sweep.code_version(sweepdemo_main.run) != before
+    assert sweep.run_sweep(sweepdemo_main.run, [{'x': 1}], cache_dir=cache, max_workers=1) == [101]
+    sys.modules.pop('sweepdemo_main', None)
+
+
+def test_simulation_dependencies_are_hashed():
+    from simulations import chaos_lyapunov2
+
+    deps = sweep.dependencies(chaos_lyapunov2.run)
+    for name in ('simulations.lyapunov_ensemble', 'simulations.integrators', 'simulations.precision'):
+        assert name in deps
+    assert not any(name.startswith(('numpy', 'scipy', 'matplotlib')) for name in deps)
+
+
+def test_blas_pinning_leaves_the_caller_alone(tmp_path, monkeypatch):
+    calls = []
+    fake = types.ModuleType('threadpoolctl')
+    fake.threadpool_limits = calls.append
+    monkeypatch.setitem(sys.modules, 'threadpoolctl', fake)  # Parent only; workers import their own
+    monkeypatch.setenv('OMP_NUM_THREADS', '7')
+    monkeypatch.delenv('MKL_NUM_THREADS', raising=False)
+
+    assert sweep.run_sweep(os.getenv, [{'key': 'OMP_NUM_THREADS'}], cache_dir=None, max_workers=1,
+                           blas_threads=2, version='env') == ['2']
+    assert calls == []
+    assert os.environ['OMP_NUM_THREADS'] == '7'
+    assert 'MKL_NUM_THREADS' not in os.environ
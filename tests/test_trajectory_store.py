@@ -0,0 +1,22 @@
+import os
+
+import numpy as np
+from simulations.trajectory_store import OFFSETS, TrajectoryReader, TrajectoryWriter
+
+
+def test_append_mode_drops_partial_offsets_entry(tmp_path):
+    path = str(tmp_path / 'traj')
+    frames = [np.full((n, 2), n, dtype=float) for n in (3, 5, 4)]
+    with TrajectoryWriter(path, 2) as writer:
+        for frame in frames[:2]:
+            writer.append(frame)
+    with open(os.path.join(path, OFFSETS), 'ab') as f:
+        f.write(b'\x01\x02\x03')  # A crash mid-write
+
+    with TrajectoryWriter(path, 2, mode='a') as writer:
+        assert len(writer) == 2
+        writer.append(frames[2])
+    reader = TrajectoryReader(path)
+    assert len(reader) == 3
+    for t, frame in enumerate(frames):
+        np.testing.assert_array_equal(reader[t], frame)